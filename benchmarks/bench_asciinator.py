@@ -0,0 +1,60 @@
+""" Benchmark Results_Window.render_block_art against the original per-pixel loop
+
+    Usage: python benchmarks/bench_asciinator.py [repeat]
+"""
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'spoticon'))
+
+from fixtures import make_cover
+from PIL import Image
+from screens import CHAR_SEQ, Results_Window
+
+
+def legacy_block_art(orig_image, width):
+    """ The original per-pixel asciinator loop, kept as the reference output """
+    if orig_image.mode == 'RGBA':
+        bg_image = Image.new("RGBA", orig_image.size, "white")
+        bg_image.paste(orig_image, (0,0), orig_image)
+        orig_image = bg_image
+    if orig_image.mode != '1':
+        orig_image = orig_image.convert('P').convert('1')
+    img_width, img_height = orig_image.size
+    orig_image = orig_image.crop((0, int(img_height*.2), img_width, int(img_height*.8)))
+    new_width = int(math.ceil(width / 2.0) * 2) * 2
+    new_height = int(math.ceil(new_width / 6.0)) * 2
+    image = orig_image.resize((new_width, new_height), Image.LANCZOS)
+    pix = image.load()
+    THRESHOLD = 255
+    lines = []
+    for y in range(0, new_height, 2):
+        s = ''
+        for x in range(0, new_width, 2):
+            char_index = int(pix[x, y] / THRESHOLD * 8) + int(pix[x+1, y] / THRESHOLD * 4) + int(pix[x, y+1] / THRESHOLD * 2) + int(pix[x+1, y+1] / THRESHOLD)
+            s += CHAR_SEQ[char_index]
+        lines.append(s)
+    return lines
+
+
+def main(repeat=20):
+    window = Results_Window.__new__(Results_Window)
+    for (mode, seed) in (('RGB', 0), ('RGBA', 1), ('L', 2)):
+        cover = make_cover(mode=mode, seed=seed)
+        for width in (100, 101, 40):
+            if window.render_block_art(cover, width) != legacy_block_art(cover, width):
+                sys.exit('render_block_art output differs from reference for {0} cover at width {1}'.format(mode, width))
+
+    print('output identical to reference')
+    # A colour cover includes the dithering conversion both versions share,
+    # a 1-bit cover isolates the per-character work that was vectorized
+    for (name, cover) in (('colour cover', make_cover()), ('1-bit cover', make_cover(mode='1'))):
+        legacy = min(timeit.repeat(lambda: legacy_block_art(cover, 100), number=1, repeat=repeat))
+        vectorized = min(timeit.repeat(lambda: window.render_block_art(cover, 100), number=1, repeat=repeat))
+        print('{0}: legacy loop {1:.3f} ms, render_block_art {2:.3f} ms, speedup {3:.1f}x'.format(name, legacy * 1000, vectorized * 1000, legacy / vectorized))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
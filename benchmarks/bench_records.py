@@ -0,0 +1,99 @@
+""" Benchmark memory and time of parsing a large playlist into records versus dicts
+
+    Usage: python benchmarks/bench_records.py [tracks]
+"""
+import gc
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'spoticon'))
+
+import records as recordTypes
+from fixtures import Unindexed_Library, make_playlist_items
+from spotifyModel import Spotify_Model
+
+
+def legacy_parse_playlist(result):
+    """ The dict-per-track parse_playlist, kept as the reference """
+    res = []
+    for track in result:
+        if not track['track']:
+            continue
+        res.append({
+            'track_name': track['track']['name'],
+            'track_number': track['track']['track_number'],
+            'album_name': track['track']['album']['name'],
+            'album_id': track['track']['album']['id'],
+            'artist_name': track['track']['artists'][0]['name'],
+            'artist_id': track['track']['artists'][0]['id'],
+            'track_uri': track['track']['uri'],
+            'duration_ms': track['track']['duration_ms'],
+            'category': 'track',
+        })
+    return res
+
+
+def uninterned(parse):
+    """ Return parse run with album and artist fields left uninterned, to show what interning saves
+        Args:
+            parse (func) = The parse function
+    """
+    def run(items):
+        intern = recordTypes.intern
+        recordTypes.intern = lambda value: value
+        try:
+            return parse(items)
+        finally:
+            recordTypes.intern = intern
+    return run
+
+
+def measure(parse, payload):
+    """ Return bytes and blocks still held by parse's results once the decoded response
+        is dropped, and parse's best time in seconds
+        Args:
+            parse (func) = The parse function
+            payload (str) = The JSON response body
+    """
+    items = json.loads(payload)
+    seconds = min(timeit.repeat(lambda: parse(items), number=1, repeat=5))
+    del items
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    items = json.loads(payload)
+    parsed = parse(items)
+    del items
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    retained = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    del parsed
+    return (retained, blocks, seconds)
+
+
+def main(count=10000):
+    model = Spotify_Model.__new__(Spotify_Model)
+    model.library = Unindexed_Library()
+    # Decoding JSON gives every track its own copies of repeated names and ids, as a real response does
+    payload = json.dumps(make_playlist_items(count))
+    items = json.loads(payload)
+    records = model.parse_playlist(items)
+    for (record, legacy) in zip(records, legacy_parse_playlist(items)):
+        if record.to_dict() != legacy:
+            sys.exit('record fields differ from dict parse: {0!r} != {1!r}'.format(record.to_dict(), legacy))
+    del records, items
+
+    for (name, parse) in (('dicts', legacy_parse_playlist), ('uninterned', uninterned(model.parse_playlist)), ('records', model.parse_playlist)):
+        (retained, blocks, seconds) = measure(parse, payload)
+        print('{0:<10} {1:>10,} bytes retained  {2:>8,} blocks  {3:8.2f} ms for {4:,} tracks'.format(name, retained, blocks, seconds * 1000, count))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
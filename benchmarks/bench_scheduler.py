@@ -0,0 +1,123 @@
+""" Benchmark Spotify_Model requests through the request scheduler against a local stand-in
+    for the Web API which allows limit requests per second and answers 429 above it
+
+    Usage: python benchmarks/bench_scheduler.py [requests] [limit] [threads]
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'spoticon'))
+
+from requestScheduler import Request_Scheduler
+from spotifyModel import Spotify_Model
+
+
+class Rate_Limited_Server(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, limit, latency=0.02):
+        """ A local HTTP server allowing limit requests per second from a token bucket
+            Args:
+                limit (float) = The requests per second allowed
+                latency (float) = Seconds each allowed request takes
+        """
+        ThreadingHTTPServer.__init__(self, ('127.0.0.1', 0), Rate_Limited_Handler)
+        self.limit = limit
+        self.latency = latency
+        self.tokens = limit
+        self.refilled = time.monotonic()
+        self.lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def take(self):
+        """ Return 0 if a request is allowed, or seconds until one will be """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.limit, self.tokens + (now - self.refilled) * self.limit)
+            self.refilled = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.allowed += 1
+                return 0
+            self.limited += 1
+            return (1 - self.tokens) / self.limit
+
+
+class Rate_Limited_Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        wait = self.server.take()
+        if wait:
+            # Like Spotify, Retry-After is in whole seconds
+            self.respond(429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}}, {'Retry-After': str(math.ceil(wait))})
+        else:
+            time.sleep(self.server.latency)
+            albumId = self.path.rstrip('/').split('/')[-1].split('?')[0]
+            self.respond(200, {'id': albumId, 'name': 'Album ' + albumId, 'tracks': {'items': []}})
+
+    def respond(self, status, body, headers={}):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def main(count=300, limit=20, threads=16):
+    server = Rate_Limited_Server(limit)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # The client starts out allowed twice the server's limit
+    auth = {'username': None, 'client_id': None, 'client_secret': None, 'redirect_uri': None}
+    model = Spotify_Model(auth, scheduler=Request_Scheduler(rate=2 * limit, burst=2 * limit, maxConcurrency=threads))
+    model.spotify.prefix = 'http://127.0.0.1:{0}/v1/'.format(server.server_port)
+
+    ids = iter(range(count))
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        while True:
+            with lock:
+                albumId = next(ids, None)
+            if albumId is None:
+                return
+            try:
+                model.request(model.spotify.album, '{0:022d}'.format(albumId))
+            except Exception as error:
+                errors.append(error)
+
+    start = time.monotonic()
+    workers = [threading.Thread(target=worker) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.monotonic() - start
+    server.shutdown()
+
+    # The server's bucket starts full, so limit requests are free
+    ideal = max(count - limit, 0) / limit
+    print('{0} requests in {1:.2f} s, {2:.1f}/s against a limit of {3}/s ({4:.0%} of ideal)'.format(count, elapsed, count / elapsed, limit, ideal / elapsed if elapsed else 1))
+    print('{0} answered 429, {1} errors raised to callers'.format(server.limited, len(errors)))
+    print('scheduler: {0}'.format(model.scheduler.stats()))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
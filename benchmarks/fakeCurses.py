@@ -0,0 +1,142 @@
+""" An in-memory stand-in for curses windows, so screens can be drawn without a terminal """
+import curses
+
+
+class Fake_Window(object):
+
+    def __init__(self, height=60, width=160, parent=None, beginY=0, beginX=0):
+        """ A curses window which keeps its text in memory and counts writes
+            Args:
+                height (int) = The line height of the window
+                width (int) = The char width of the window
+                parent (obj) = The window this one was derived from, sharing its cells
+                beginY (int) = The line of the parent this window begins on
+                beginX (int) = The char of the parent this window begins on
+        """
+        self.height = height
+        self.width = width
+        self.parent = parent
+        self.beginY = beginY
+        self.beginX = beginX
+        self.rows = [[' '] * width for y in range(height)] if parent is None else None
+        self.cursor = (0, 0)
+        self.writes = 0
+        self.refreshes = 0
+        self.keys = []
+        self.timeoutMs = -1
+
+    def cells(self, y):
+        """ Return the list of chars of a window line, shared with the parent window """
+        if self.parent:
+            return self.parent.cells(self.beginY + y)
+        return self.rows[y]
+
+    def offset(self):
+        """ Return the char offset of this window in its top level window """
+        return self.beginX + (self.parent.offset() if self.parent else 0)
+
+    def derwin(self, height, width, beginY, beginX):
+        return Fake_Window(height, width, self, beginY, beginX)
+
+    def getmaxyx(self):
+        return (self.height, self.width)
+
+    def write(self, y, x, text):
+        row = self.cells(y)
+        start = self.offset() + x
+        end = min(start + len(text), self.offset() + self.width)
+        row[start:end] = list(text[:end - start])
+        self.writes += 1
+
+    def addstr(self, y, x, text, attr=0):
+        if y >= self.height:
+            raise curses.error('addstr() returned ERR')
+        self.write(y, x, text)
+        self.cursor = (y, x + len(text))
+
+    def clear(self):
+        self.erase()
+
+    def erase(self):
+        for y in range(self.height):
+            self.write(y, 0, ' ' * self.width)
+
+    def clrtoeol(self):
+        (y, x) = self.cursor
+        self.write(y, x, ' ' * (self.width - x))
+
+    def move(self, y, x):
+        self.cursor = (y, x)
+
+    def top(self):
+        """ Return the line of the top level window this window begins on """
+        return self.beginY + (self.parent.top() if self.parent else 0)
+
+    def spans_root(self):
+        """ Return whether this window is as wide as the top level window """
+        return self.offset() == 0 and self.width == self.root().width
+
+    def deleteln(self):
+        y = self.cursor[0]
+        if self.spans_root():
+            rows = self.root().rows
+            del rows[self.top() + y]
+            rows.insert(self.top() + self.height - 1, [' '] * self.width)
+            self.writes += 1
+            return
+        lines = [''.join(self.cells(row)[self.offset():self.offset() + self.width]) for row in range(y + 1, self.height)]
+        for (row, text) in enumerate(lines, y):
+            self.write(row, 0, text)
+        self.write(self.height - 1, 0, ' ' * self.width)
+
+    def insertln(self):
+        y = self.cursor[0]
+        if self.spans_root():
+            rows = self.root().rows
+            del rows[self.top() + self.height - 1]
+            rows.insert(self.top() + y, [' '] * self.width)
+            self.writes += 1
+            return
+        lines = [''.join(self.cells(row)[self.offset():self.offset() + self.width]) for row in range(y, self.height - 1)]
+        for (row, text) in enumerate(lines, y + 1):
+            self.write(row, 0, text)
+        self.write(y, 0, ' ' * self.width)
+
+    def border(self, *args):
+        pass
+
+    def refresh(self):
+        self.refreshes += 1
+
+    def noutrefresh(self):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def timeout(self, delay):
+        self.timeoutMs = delay
+
+    def getch(self):
+        """ Return the next scripted key, or -1 as curses does when a timeout passes """
+        window = self.root()
+        if not window.keys:
+            return -1
+        key = window.keys.pop(0)
+        return ord(key) if isinstance(key, str) else key
+
+    def get_wch(self):
+        """ Return the next scripted key, raising curses.error as curses does when a timeout passes """
+        window = self.root()
+        if not window.keys:
+            raise curses.error('no input')
+        return window.keys.pop(0)
+
+    def root(self):
+        """ Return the top level window, which holds the scripted keys """
+        return self.parent.root() if self.parent else self
+
+    def text(self):
+        """ Return the screen contents as lines of text """
+        window = self.root()
+        return [''.join(row).rstrip() for row in window.rows]
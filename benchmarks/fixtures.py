@@ -0,0 +1,169 @@
+""" Deterministic Spotify Web API responses and cover images for the benchmarks. Fixtures are
+    generated into benchmarks/fixtures on first use and read back from there afterwards.
+"""
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'spoticon'))
+
+from libraryIndex import Library_Index
+from PIL import Image, ImageDraw
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class Unindexed_Library(Library_Index):
+
+    def add(self, records):
+        """ Ignore parsed records, so benchmarks of the parse functions measure only parsing """
+        pass
+
+
+def make_id(rand):
+    """ Return a random 22 character Spotify style id """
+    return '{0:022x}'.format(rand.getrandbits(88))
+
+
+def make_images(rand, base='https://i.scdn.co/image/'):
+    """ Return the three sizes of cover image Spotify lists for an album
+        Args:
+            base (str) = The url the image urls begin with
+    """
+    imageId = make_id(rand)
+    return [{'url': '{0}{1}{2}'.format(base, size, imageId), 'height': size, 'width': size} for size in (640, 300, 64)]
+
+
+def make_artists(count, rand):
+    """ Return full artist objects """
+    return [{
+        'id': make_id(rand),
+        'name': 'Artist {0}'.format(i),
+        'uri': 'spotify:artist:' + make_id(rand),
+        'popularity': rand.randrange(100),
+        'genres': ['genre {0}'.format(rand.randrange(20))],
+        'images': make_images(rand),
+    } for i in range(count)]
+
+
+def make_albums(count, rand, artists=None):
+    """ Return simplified album objects as listed by search and artist_albums """
+    artists = artists or make_artists(count // 4 + 1, rand)
+    albums = []
+    for i in range(count):
+        albumId = make_id(rand)
+        artist = artists[rand.randrange(len(artists))]
+        albums.append({
+            'id': albumId,
+            'name': 'Album {0}'.format(i),
+            'uri': 'spotify:album:' + albumId,
+            'album_type': rand.choice(('album', 'single', 'compilation')),
+            'release_date': '{0}-01-01'.format(rand.randrange(1960, 2024)),
+            'total_tracks': rand.randrange(1, 20),
+            'artists': [{'id': artist['id'], 'name': artist['name'], 'uri': artist['uri']}],
+            'images': make_images(rand),
+        })
+    return albums
+
+
+def make_tracks(count, rand, albums=None):
+    """ Return full track objects as listed by search and playlists """
+    albums = albums or make_albums(count // 12 + 1, rand)
+    tracks = []
+    for i in range(count):
+        album = dict(albums[rand.randrange(len(albums))])
+        trackId = make_id(rand)
+        tracks.append({
+            'id': trackId,
+            'name': 'Track {0}'.format(i),
+            'track_number': rand.randrange(1, 15),
+            'disc_number': 1,
+            'album': album,
+            'artists': list(album['artists']),
+            'uri': 'spotify:track:' + trackId,
+            'duration_ms': rand.randrange(120000, 420000),
+            'popularity': rand.randrange(100),
+            'explicit': False,
+        })
+    return tracks
+
+
+def make_playlist_items(count, seed=0):
+    """ Return Spotify API playlist track items shaped like user_playlist_tracks results
+        Args:
+            count (int) = The number of tracks
+            seed (int) = The random seed
+    """
+    rand = random.Random(seed)
+    return [{'added_at': '2020-01-01T00:00:00Z', 'track': track} for track in make_tracks(count, rand)]
+
+
+def make_cover(size=640, mode='RGB', seed=0):
+    """ Return a synthetic album cover with gradients, shapes and noise
+        Args:
+            size (int) = The pixel width and height of the cover
+            mode (str) = The PIL image mode
+            seed (int) = The random seed
+    """
+    rand = random.Random(seed)
+    image = Image.new('RGB', (size, size))
+    draw = ImageDraw.Draw(image)
+    for y in range(size):
+        draw.line([(0, y), (size, y)], fill=(y * 255 // size, 128, 255 - y * 255 // size))
+    for _ in range(40):
+        x, y = rand.randrange(size), rand.randrange(size)
+        r = rand.randrange(10, size // 4)
+        draw.ellipse([x - r, y - r, x + r, y + r], fill=tuple(rand.randrange(256) for _ in range(3)))
+    noise = Image.frombytes('RGB', (size, size), bytes(rand.randrange(32) for _ in range(size * size * 3)))
+    image = Image.blend(image, noise, 0.2)
+    return image.convert(mode)
+
+
+def make_responses(seed=0):
+    """ Return fixture file name -> response of realistic size: a search with 50 tracks,
+        10 albums and 5 artists, a 10,000 track playlist, and an artist with 200 albums
+    """
+    rand = random.Random(seed)
+    return {
+        'search_tracks.json': {'tracks': {'items': make_tracks(50, rand), 'total': 50}},
+        'search_albums.json': {'albums': {'items': make_albums(10, rand), 'total': 10}},
+        'search_artists.json': {'artists': {'items': make_artists(5, rand), 'total': 5}},
+        'playlist_tracks.json': {'items': make_playlist_items(10000, seed), 'total': 10000},
+        'artist_albums.json': {'items': make_albums(200, rand), 'total': 200},
+    }
+
+
+def generate(directory=FIXTURE_DIR):
+    """ Write the response fixtures and cover images to directory """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for (name, response) in make_responses().items():
+        with open(os.path.join(directory, name), 'w') as fixture:
+            json.dump(response, fixture)
+    for (mode, seed) in (('RGB', 0), ('RGBA', 1), ('1', 2)):
+        make_cover(mode=mode, seed=seed).save(os.path.join(directory, 'cover_{0}.png'.format(mode)))
+
+
+def path(name, directory=FIXTURE_DIR):
+    """ Return path of a fixture, generating the fixtures if they are missing
+        Args:
+            name (str) = The fixture file name
+    """
+    fixturePath = os.path.join(directory, name)
+    if not os.path.exists(fixturePath):
+        generate(directory)
+    return fixturePath
+
+
+def load(name, directory=FIXTURE_DIR):
+    """ Return a decoded response fixture
+        Args:
+            name (str) = The fixture file name
+    """
+    with open(path(name, directory)) as fixture:
+        return json.load(fixture)
+
+
+if __name__ == '__main__':
+    generate()
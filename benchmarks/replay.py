@@ -0,0 +1,342 @@
+""" Replay scripted sessions of the whole Spoticon controller without a terminal, Spotify
+    credentials or the Spotify app. Key presses are sent to a virtual curses screen, the Web API
+    is a local stand-in serving generated responses after a set latency, and the player is the
+    fake backend. Each scenario reports its commands' latency percentiles, the peak memory of
+    the process and the API calls it made.
+
+    Usage: python benchmarks/replay.py [scenario ...] [--latency SECONDS] [--artists N] [--albums N] [--tracks N]
+
+    With more than one scenario each runs in its own process, so peak memory is per scenario.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'spoticon'))
+
+import fixtures
+
+from fakeCurses import Fake_Window
+from httpTransport import Http_Transport
+from main import Spoticon
+from playerBackends import Fake_Backend
+from spotifyModel import Spotify_Model
+from spotifyPlayer import Spotify_Player
+
+# Scenario name -> function driving a Replay_Session, in run order
+SCENARIOS = OrderedDict()
+
+
+def scenario(name):
+    """ Register a scenario under name """
+    def register(play):
+        SCENARIOS[name] = play
+        return play
+    return register
+
+
+class Fake_Catalog(object):
+
+    def __init__(self, artists=50, albumsPerArtist=20, tracksPerAlbum=12, imageUrl='https://i.scdn.co/image/', seed=0):
+        """ A generated Spotify catalog of artists, their albums and the albums' tracks,
+            answering the Web API requests Spoticon makes
+            Args:
+                artists (int) = The number of artists, named 'Artist 0' onwards
+                albumsPerArtist (int) = The number of albums of each artist
+                tracksPerAlbum (int) = The number of tracks on each album
+                imageUrl (str) = The url cover image urls begin with
+                seed (int) = The random seed
+        """
+        rand = random.Random(seed)
+        self.artists = fixtures.make_artists(artists, rand)
+        for artist in self.artists:
+            for image in artist['images']:
+                image['url'] = image['url'].replace('https://i.scdn.co/image/', imageUrl)
+
+        # Album id -> full album object, artist id -> album ids
+        self.albums = OrderedDict()
+        self.artistAlbums = {}
+        self.tracks = []
+        for artist in self.artists:
+            credit = {'id': artist['id'], 'name': artist['name'], 'uri': artist['uri']}
+            self.artistAlbums[artist['id']] = []
+            for i in range(albumsPerArtist):
+                albumId = fixtures.make_id(rand)
+                album = {
+                    'id': albumId,
+                    'name': 'Album {0}'.format(len(self.albums)),
+                    'uri': 'spotify:album:' + albumId,
+                    'album_type': 'album',
+                    'release_date': '{0}-01-01'.format(rand.randrange(1960, 2024)),
+                    'total_tracks': tracksPerAlbum,
+                    'artists': [credit],
+                    'images': fixtures.make_images(rand, imageUrl),
+                }
+                items = []
+                for number in range(1, tracksPerAlbum + 1):
+                    trackId = fixtures.make_id(rand)
+                    track = {
+                        'id': trackId,
+                        'name': 'Track {0}'.format(len(self.tracks)),
+                        'track_number': number,
+                        'disc_number': 1,
+                        'artists': [credit],
+                        'uri': 'spotify:track:' + trackId,
+                        'duration_ms': rand.randrange(120000, 420000),
+                        'explicit': False,
+                    }
+                    items.append(track)
+                    self.tracks.append(dict(track, album=album, popularity=rand.randrange(100)))
+                self.albums[albumId] = dict(album, tracks={'items': items, 'total': len(items)})
+                self.artistAlbums[artist['id']].append(albumId)
+
+    def simplified(self, albumId):
+        """ Return an album without its tracks, as albums are listed """
+        return {key: value for (key, value) in self.albums[albumId].items() if key != 'tracks'}
+
+    def page(self, items, query):
+        """ Return the Web API paging object for the limit and offset of a query """
+        limit = int(query.get('limit', 20))
+        offset = int(query.get('offset', 0))
+        return {'items': items[offset:offset + limit], 'total': len(items), 'limit': limit, 'offset': offset}
+
+    def search(self, query):
+        """ Return search results for items whose name has every word of the query """
+        words = query['q'].lower().split()
+        kind = query['type']
+        items = {'artist': self.artists, 'album': [self.simplified(albumId) for albumId in self.albums], 'track': self.tracks}[kind]
+        matches = [item for item in items if all(word in item['name'].lower().split() for word in words)]
+        return {kind + 's': self.page(matches, query)}
+
+    def respond(self, parts, query):
+        """ Return (endpoint name, status, response) for a Web API path
+            Args:
+                parts (array) = The path segments after /v1
+                query (obj) = The query string parameters
+        """
+        if parts == ['search']:
+            return ('search', 200, self.search(query))
+        if len(parts) == 3 and parts[0] == 'artists' and parts[1] in self.artistAlbums:
+            albumIds = self.artistAlbums[parts[1]]
+            if parts[2] == 'albums':
+                return ('artist albums', 200, self.page([self.simplified(albumId) for albumId in albumIds], query))
+            if parts[2] == 'top-tracks':
+                return ('artist top tracks', 200, {'tracks': [track for track in self.tracks if track['artists'][0]['id'] == parts[1]][:10]})
+        if parts == ['albums'] and 'ids' in query:
+            return ('several albums', 200, {'albums': [self.albums.get(albumId) for albumId in query['ids'].split(',')]})
+        if len(parts) == 2 and parts[0] == 'albums' and parts[1] in self.albums:
+            return ('album', 200, self.albums[parts[1]])
+        return ('not found', 404, {'error': {'status': 404, 'message': 'Not found'}})
+
+
+class Fake_Spotify_Server(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.03, **catalog):
+        """ A local stand-in for the Spotify Web API and image CDN serving a Fake_Catalog
+            Args:
+                latency (float) = Seconds each request takes
+                catalog (obj) = Arguments for the Fake_Catalog
+        """
+        ThreadingHTTPServer.__init__(self, ('127.0.0.1', 0), Fake_Spotify_Handler)
+        self.url = 'http://127.0.0.1:{0}'.format(self.server_port)
+        self.latency = latency
+        self.catalog = Fake_Catalog(imageUrl=self.url + '/image/', **catalog)
+        with open(fixtures.path('cover_RGB.png'), 'rb') as cover:
+            self.cover = cover.read()
+        self.lock = threading.Lock()
+        self.calls = Counter()
+
+    def count(self, endpoint):
+        """ Record a request to endpoint """
+        with self.lock:
+            self.calls[endpoint] += 1
+
+
+class Fake_Spotify_Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        if parts and parts[0] == 'image':
+            self.server.count('image')
+            self.send(200, self.server.cover, 'image/png')
+            return
+        query = {key: values[0] for (key, values) in parse_qs(url.query).items()}
+        (endpoint, status, body) = self.server.catalog.respond(parts[1:], query)
+        self.server.count(endpoint)
+        self.send(status, json.dumps(body).encode('utf-8'), 'application/json')
+
+    def send(self, status, data, contentType):
+        self.send_response(status)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class Replay_Session(object):
+
+    def __init__(self, server, height=60, width=160, poll=0.001):
+        """ A Spoticon controller on a virtual screen, talking to server and a fake player
+            Args:
+                server (obj) = The Fake_Spotify_Server to make requests to
+                height (int) = The line height of the virtual screen
+                width (int) = The char width of the virtual screen
+                poll (float) = Seconds between checks for finished background work
+        """
+        self.server = server
+        self.poll = poll
+        self.screen = Fake_Window(height, width)
+        auth = {'username': None, 'client_id': None, 'client_secret': None, 'redirect_uri': None}
+        config = {'auth': auth, 'cache_dir': None, 'player_backend': 'fake', 'offline': False, 'search_debounce': 0.15, 'http_timeout': 5, 'api_rate': 20, 'api_burst': 100}
+
+        transport = Http_Transport()
+        model = Spotify_Model(auth, transport=transport)
+        model.spotify.prefix = server.url + '/v1/'
+        player = Spotify_Player(backend=Fake_Backend())
+        self.app = Spoticon(self.screen, config=config, spotifyModel=model, spotifyPlayer=player, transport=transport)
+
+        # Command name -> seconds each press took
+        self.latencies = OrderedDict()
+
+    def settle(self):
+        """ Run the input loop without key presses until every request started has been shown """
+        while not self.app.dispatcher.idle():
+            time.sleep(self.poll)
+            self.app.handle_key(-1)
+
+    def timed(self, name, command, *args):
+        """ Run command and wait for its results to be shown, recording the time taken under name """
+        start = time.perf_counter()
+        command(*args)
+        self.settle()
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+
+    def press(self, key):
+        """ Press key and wait for its results to be shown
+            Args:
+                key (str) = The key, or a curses key code
+        """
+        charInput = ord(key) if isinstance(key, str) else key
+        self.timed(self.app.commands[charInput].__name__, self.app.handle_key, charInput)
+
+    def search(self, query):
+        """ Search for query as if it had been typed at the search prompt
+            Args:
+                query (str) = The query string
+        """
+        self.timed('search', self.app.search_library, query)
+
+    def close(self):
+        """ Wait for background album fetches, then shut the controller down """
+        self.app.spotifyModel.hydratePool.shutdown(wait=True)
+        self.app.close()
+
+
+@scenario('browse_artists')
+def browse_artists(session, artists):
+    """ Search for each artist, open them and go back to the search results """
+    for i in range(artists):
+        session.search('Artist {0}'.format(i))
+        # The first artist is below the title bar
+        session.press('j')
+        session.press('\n')
+        session.press('b')
+    return 'opened {0} artists'.format(artists)
+
+
+@scenario('queue_discography')
+def queue_discography(session, artists):
+    """ Open an artist, then open each of their albums in turn and queue all its tracks """
+    session.search('Artist 0')
+    session.press('j')
+    session.press('\n')
+    # The album art below the title bar opens the album the carousel is on
+    session.press('j')
+    albums = len(session.app.results['albums'])
+    for i in range(albums):
+        session.press('\n')
+        session.press('.')
+        session.press('b')
+        session.press('l')
+    return 'queued {0} tracks from {1} albums'.format(len(session.app.playQueue.playQueue), albums)
+
+
+def percentile(times, fraction):
+    """ Return the nearest rank percentile of times """
+    ordered = sorted(times)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def peak_rss():
+    """ Return the peak resident memory of this process in bytes """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def report(name, session, elapsed, summary):
+    print('{0}: {1} in {2:.2f} s'.format(name, summary, elapsed))
+    print('  {0:<36} {1:>6} {2:>9} {3:>9} {4:>9} {5:>9}'.format('command', 'count', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms'))
+    for (command, times) in session.latencies.items():
+        print('  {0:<36} {1:>6} {2:>9.1f} {3:>9.1f} {4:>9.1f} {5:>9.1f}'.format(command, len(times), percentile(times, 0.5) * 1000, percentile(times, 0.9) * 1000, percentile(times, 0.99) * 1000, max(times) * 1000))
+    print('  peak RSS {0:.1f} MB'.format(peak_rss() / 2**20))
+    calls = session.server.calls
+    print('  API calls {0}: {1}'.format(sum(calls.values()), ', '.join('{0} {1}'.format(endpoint, count) for (endpoint, count) in calls.most_common())))
+    print('  scheduler: {0}'.format(session.app.spotifyModel.scheduler.stats()))
+
+
+def play(name, args):
+    """ Run one scenario in this process and print its report """
+    server = Fake_Spotify_Server(latency=args.latency, artists=args.artists, albumsPerArtist=args.albums, tracksPerAlbum=args.tracks)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = Replay_Session(server)
+    start = time.perf_counter()
+    summary = SCENARIOS[name](session, args.artists)
+    elapsed = time.perf_counter() - start
+    session.close()
+    report(name, session, elapsed, summary)
+    server.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay scripted Spoticon sessions against a fake Spotify')
+    parser.add_argument('scenarios', nargs='*', help='scenarios to run, all by default: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--latency', type=float, default=0.03, help='seconds each API request takes')
+    parser.add_argument('--artists', type=int, default=50, help='artists in the catalog')
+    parser.add_argument('--albums', type=int, default=20, help='albums of each artist')
+    parser.add_argument('--tracks', type=int, default=12, help='tracks on each album')
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error('unknown scenario {0}'.format(name))
+    if len(names) == 1:
+        play(names[0], args)
+        return
+    for name in names:
+        subprocess.check_call([sys.executable, os.path.abspath(__file__), name, '--latency', str(args.latency), '--artists', str(args.artists), '--albums', str(args.albums), '--tracks', str(args.tracks)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+""" Run the offline benchmark suite over the parse, layout, render and album art hot paths
+
+    Usage: python benchmarks/run.py [--repeat N] [--filter TEXT] [--save FILE] [--compare FILE] [--threshold FRACTION]
+
+    --save writes the results as a JSON baseline, --compare reports each benchmark against
+    a saved baseline and exits non-zero if any is slower by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'spoticon'))
+
+import fixtures
+
+from fakeCurses import Fake_Window
+from libraryIndex import Library_Index
+from resultSet import Result_Set
+from screens import Results_Window, Scroll_Window
+from spotifyModel import Spotify_Model
+
+# Benchmark name -> function returning the function to time, in run order
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """ Register a benchmark setup function under name """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def make_model():
+    """ Return a Spotify_Model which only parses, without credentials, network or indexing """
+    model = Spotify_Model.__new__(Spotify_Model)
+    model.library = fixtures.Unindexed_Library()
+    return model
+
+
+def make_results_window(height=60, width=160):
+    """ Return a Results_Window drawing to a fake curses screen """
+    return Results_Window(Fake_Window(height + 10, width), height, width, 5, 0)
+
+
+def search_results(model):
+    """ Return parsed results of the search fixture """
+    return {
+        'artists': model.parse_artists(fixtures.load('search_artists.json')['artists']['items']),
+        'albums': model.parse_albums(fixtures.load('search_albums.json')['albums']['items']),
+        'tracks': model.parse_tracks(fixtures.load('search_tracks.json')['tracks']['items'], source='search'),
+    }
+
+
+def playlist_results(model):
+    """ Return parsed results of the 10,000 track playlist fixture """
+    return {'tracks': model.parse_playlist(fixtures.load('playlist_tracks.json')['items'])}
+
+
+@benchmark('parse_tracks.search_50')
+def bench_parse_tracks():
+    model = make_model()
+    items = fixtures.load('search_tracks.json')['tracks']['items']
+    return lambda: model.parse_tracks(items, source='search')
+
+
+@benchmark('parse_albums.artist_200')
+def bench_parse_albums():
+    model = make_model()
+    items = fixtures.load('artist_albums.json')['items']
+    return lambda: model.parse_albums(items)
+
+
+@benchmark('parse_playlist.tracks_10000')
+def bench_parse_playlist():
+    model = make_model()
+    items = fixtures.load('playlist_tracks.json')['items']
+    return lambda: model.parse_playlist(items)
+
+
+@benchmark('library_index.add_10000')
+def bench_library_index():
+    records = playlist_results(make_model())['tracks']
+
+    def run():
+        library = Library_Index()
+        with library.lock:
+            library.index_records(records)
+
+    return run
+
+
+@benchmark('order_lines.search')
+def bench_order_lines_search():
+    window = make_results_window()
+    window.lines = search_results(make_model())
+    return window.order_lines
+
+
+@benchmark('order_lines.playlist_10000')
+def bench_order_lines_playlist():
+    window = make_results_window()
+    window.lines = playlist_results(make_model())
+    return window.order_lines
+
+
+@benchmark('stringify_line.playlist_10000')
+def bench_stringify_line():
+    window = make_results_window()
+    window.lines = playlist_results(make_model())
+    window.order_lines()
+    lines = window.orderedLines
+    return lambda: [window.stringify_line(line) for line in lines]
+
+
+@benchmark('draw_screen.full_redraw')
+def bench_draw_screen_full():
+    window = make_results_window()
+    window.draw_screen(Result_Set(playlist_results(make_model())))
+
+    def run():
+        # A new result set of the same lines, so nothing is reused from the last draw
+        window.draw_screen(Result_Set(window.lines))
+
+    return run
+
+
+@benchmark('draw_screen.scroll_100_rows')
+def bench_draw_screen_scroll():
+    window = Scroll_Window(Fake_Window(70, 160), 60, 160, 5, 0)
+    window.render_line = lambda line, highlighted: (str(line), 0)
+    lines = list(range(10000))
+
+    def run():
+        window.draw_screen(lines[:])
+        for step in range(100):
+            window.updown(1)
+
+    return run
+
+
+def bench_asciinator(mode):
+    window = make_results_window()
+    url = 'file://' + fixtures.path('cover_{0}.png'.format(mode))
+    return lambda: window.asciinator(url, 100)
+
+
+for mode in ('RGB', 'RGBA', '1'):
+    benchmark('asciinator.cover_{0}'.format(mode))(lambda mode=mode: bench_asciinator(mode))
+
+
+def run(names, repeat):
+    """ Return name -> timings in seconds of each benchmark
+        Args:
+            names (array) = The benchmark names to run
+            repeat (int) = The number of timed runs of each
+    """
+    results = {}
+    for name in names:
+        task = BENCHMARKS[name]()
+        # One untimed run fills lazy caches such as interned strings and imports
+        task()
+        times = timeit.repeat(task, number=1, repeat=repeat)
+        results[name] = {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+        print('{0:<32} min {1:9.3f} ms   median {2:9.3f} ms'.format(name, results[name]['min'] * 1000, results[name]['median'] * 1000))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Print each benchmark's change from baseline and return the names of those slower than threshold
+        Args:
+            results (obj) = Benchmark name -> timings of this run
+            baseline (obj) = Benchmark name -> timings of the baseline run
+            threshold (float) = The fraction slower that counts as a regression
+    """
+    regressions = []
+    print('\n{0:<32} {1:>12} {2:>12} {3:>8}'.format('compared to baseline', 'baseline', 'now', 'change'))
+    for (name, timing) in results.items():
+        if name not in baseline:
+            print('{0:<32} {1:>12} {2:>9.3f} ms {3:>8}'.format(name, 'new', timing['min'] * 1000, ''))
+            continue
+        change = timing['min'] / baseline[name]['min'] - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print('{0:<32} {1:>9.3f} ms {2:>9.3f} ms {3:>+7.1%}{4}'.format(name, baseline[name]['min'] * 1000, timing['min'] * 1000, change, '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Spoticon benchmark suite')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs of each benchmark')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--save', metavar='FILE', help='write results to this JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare results to this JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.15, help='fraction slower than baseline that fails --compare')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run(names, args.repeat)
+
+    if args.save:
+        directory = os.path.dirname(os.path.abspath(args.save))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(args.save, 'w') as baselineFile:
+            json.dump({
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'machine': platform.platform(),
+                'results': results,
+            }, baselineFile, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baselineFile:
+            baseline = json.load(baselineFile)['results']
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+
+from atomicFile import atomic_write
+from collections import OrderedDict
+
+
+class Art_Cache(object):
+
+    def __init__(self, path, maxBytes=128 * 1024 * 1024):
+        """ An on-disk cache of cover images and their rendered block art
+            Args:
+                path (str) = The directory to store cached files in
+                maxBytes (int) = The max total size of cached files
+        """
+        self.path = path
+        self.maxBytes = maxBytes
+        self.imagePath = os.path.join(path, 'images')
+        self.renderPath = os.path.join(path, 'renders')
+
+        # Relative file path -> size in least to most recently used order.
+        # Built from a directory listing on first use, file contents are
+        # only read when requested.
+        self.index = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def make_key(self, *parts):
+        """ Return file name for cache key parts
+            Args:
+                parts (str) = The values identifying the cached item
+        """
+        return hashlib.sha1('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def load_index(self):
+        """ Build LRU index from cached files' modification times. Caller must hold lock """
+        files = []
+        for directory in (self.imagePath, self.renderPath):
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            for entry in os.scandir(directory):
+                stat = entry.stat()
+                files.append((stat.st_mtime, os.path.join(os.path.basename(directory), entry.name), stat.st_size))
+        self.index = OrderedDict()
+        self.size = 0
+        for (mtime, name, size) in sorted(files):
+            self.index[name] = size
+            self.size += size
+
+    def read(self, name):
+        """ Return contents of cached file or None on miss
+            Args:
+                name (str) = The file path relative to the cache directory
+        """
+        with self.lock:
+            if self.index is None:
+                self.load_index()
+            if name not in self.index:
+                self.misses += 1
+                return None
+            self.index.move_to_end(name)
+        fullPath = os.path.join(self.path, name)
+        try:
+            with open(fullPath, 'rb') as cacheFile:
+                data = cacheFile.read()
+            # Record use so recency survives a restart
+            os.utime(fullPath)
+        except (IOError, OSError):
+            with self.lock:
+                self.size -= self.index.pop(name, 0)
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return data
+
+    def write(self, name, data):
+        """ Store file contents and evict least recently used files above maxBytes
+            Args:
+                name (str) = The file path relative to the cache directory
+                data (bytes) = The contents to store
+        """
+        fullPath = os.path.join(self.path, name)
+        with self.lock:
+            if self.index is None:
+                self.load_index()
+            atomic_write(fullPath, data)
+            self.size -= self.index.pop(name, 0)
+            self.index[name] = len(data)
+            self.size += len(data)
+            while self.size > self.maxBytes and len(self.index) > 1:
+                (oldest, size) = self.index.popitem(last=False)
+                self.size -= size
+                try:
+                    os.remove(os.path.join(self.path, oldest))
+                except OSError:
+                    pass
+
+    def get_image(self, url):
+        """ Return cached image bytes for url or None
+            Args:
+                url (str) = The image url
+        """
+        return self.read(os.path.join('images', self.make_key(url)))
+
+    def put_image(self, url, data):
+        """ Store image bytes for url
+            Args:
+                url (str) = The image url
+                data (bytes) = The encoded image
+        """
+        self.write(os.path.join('images', self.make_key(url)), data)
+
+    def get_render(self, url, width, mode):
+        """ Return cached rendered lines for image or None
+            Args:
+                url (str) = The image url
+                width (int) = The char width of the render
+                mode (str) = The render style
+        """
+        data = self.read(os.path.join('renders', self.make_key(url, width, mode)))
+        return data.decode('utf-8').split('\n') if data is not None else None
+
+    def put_render(self, url, width, mode, lines):
+        """ Store rendered lines for image
+            Args:
+                url (str) = The image url
+                width (int) = The char width of the render
+                mode (str) = The render style
+                lines (array) = The rendered lines
+        """
+        self.write(os.path.join('renders', self.make_key(url, width, mode)), '\n'.join(lines).encode('utf-8'))
+
+    def hit_rate(self):
+        """ Return the fraction of reads served from disk """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """ Return cache counters """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'files': len(self.index) if self.index is not None else 0,
+            'bytes': self.size,
+        }
@@ -0,0 +1,27 @@
+import os
+import threading
+
+
+def atomic_write(path, data):
+    """ Write a file through a temporary file in the same directory, so a crash mid-write
+        leaves the previous file in place rather than a partly written one
+        Args:
+            path (str) = The file to write. Missing directories are created
+            data (str or bytes) = The contents, or a list of str or bytes pieces of them
+    """
+    pieces = [data] if isinstance(data, (str, bytes)) else data
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Unique per thread, so concurrent writes of the same file never share a temporary file
+    tmpPath = '{0}.{1}.tmp'.format(path, threading.get_ident())
+    try:
+        with open(tmpPath, 'w' if pieces and isinstance(pieces[0], str) else 'wb') as tmpFile:
+            tmpFile.writelines(pieces)
+        os.replace(tmpPath, path)
+    except BaseException:
+        try:
+            os.remove(tmpPath)
+        except OSError:
+            pass
+        raise
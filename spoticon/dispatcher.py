@@ -0,0 +1,89 @@
+import queue
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Command_Dispatcher(object):
+
+    def __init__(self, workers=4):
+        """ Run slow commands on a worker pool and hand their results back to the UI thread
+            Args:
+                workers (int) = The number of worker threads
+        """
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+
+        # Channel -> generation of its newest request, and its newest pending future
+        self.generations = {}
+        self.pending = {}
+
+    def submit(self, channel, task, onResult, onError=None):
+        """ Run task in the background and queue onResult for the UI thread. A newer request
+            on the same channel cancels this one if it has not started, or drops its result.
+            Args:
+                channel (str) = The name of the group of requests that supersede each other
+                task (func) = The function to run in the background
+                onResult (func) = Called on the UI thread with the task's return value
+                onError (func) = Called on the UI thread with the task's exception
+        """
+        with self.lock:
+            generation = self.generations[channel] = self.generations.get(channel, 0) + 1
+            stale = self.pending.get(channel)
+            if stale:
+                stale.cancel()
+            future = self.pending[channel] = self.pool.submit(task)
+        future.add_done_callback(lambda done: self.results.put((channel, generation, done, onResult, onError)))
+        return future
+
+    def call_soon(self, callback, *args):
+        """ Queue callback to run on the UI thread
+            Args:
+                callback (func) = The function to call
+        """
+        self.results.put((None, None, None, lambda result: callback(*args), None))
+
+    def is_current(self, channel, generation):
+        """ Return whether generation is the newest request on channel
+            Args:
+                channel (str) = The request channel
+                generation (int) = The request generation
+        """
+        with self.lock:
+            return self.generations.get(channel) == generation
+
+    def busy(self):
+        """ Return whether any current request is still running """
+        with self.lock:
+            return any(not future.done() for future in self.pending.values())
+
+    def idle(self):
+        """ Return whether every current request has finished and had its callbacks run """
+        with self.lock:
+            return not self.pending and self.results.empty()
+
+    def drain(self):
+        """ Run queued callbacks on the calling (UI) thread, dropping results of superseded requests """
+        while True:
+            try:
+                (channel, generation, future, onResult, onError) = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if channel is None:
+                onResult(None)
+                continue
+            if future.cancelled() or not self.is_current(channel, generation):
+                continue
+            with self.lock:
+                if self.pending.get(channel) is future:
+                    del self.pending[channel]
+            error = future.exception()
+            if error is None:
+                onResult(future.result())
+            elif onError:
+                onError(error)
+
+    def shutdown(self):
+        """ Stop accepting work and drop queued requests """
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,137 @@
+from collections import deque
+
+
+class History_Entry(object):
+
+    __slots__ = ('results', 'descriptor', 'position', 'size')
+
+    def __init__(self, results, descriptor=None):
+        """ A screen of results in the navigation history
+            Args:
+                results (obj) = The Result_Set, or None once compacted
+                descriptor (obj) = How to rebuild the results: the query method name, args and kwargs
+        """
+        self.results = results
+        self.descriptor = descriptor
+        self.position = None
+        self.size = None
+
+
+class History_Store(object):
+
+    def __init__(self, maxEntries=200, maxResident=8, maxBytes=32 * 1024 * 1024):
+        """ Back/forward navigation history bounded by entry count and memory. Entries beyond
+            the most recent few keep only their descriptor and are rebuilt on demand.
+            Args:
+                maxEntries (int) = The max number of entries kept in each direction
+                maxResident (int) = The max number of entries holding their results in memory
+                maxBytes (int) = The max estimated size of results held in memory
+        """
+        self.maxEntries = maxEntries
+        self.maxResident = maxResident
+        self.maxBytes = maxBytes
+
+        self.backEntries = deque()
+        self.forwardEntries = deque()
+        self.current = None
+
+    def visit(self, entry, position=None):
+        """ Make entry current, pushing the current entry onto the back history
+            Args:
+                entry (obj) = The History_Entry to display
+                position (tuple) = The scroll position of the current entry
+        """
+        if self.current:
+            self.leave(self.current, position)
+            self.backEntries.append(self.current)
+        self.current = entry
+        self.compact()
+
+    def replace(self, entry):
+        """ Make entry current in place of the current entry
+            Args:
+                entry (obj) = The History_Entry to display
+        """
+        self.current = entry
+        self.compact()
+
+    def back(self, position=None):
+        """ Return previous entry and make it current, or None at the start of history
+            Args:
+                position (tuple) = The scroll position of the current entry
+        """
+        return self.move(self.backEntries, self.forwardEntries, position)
+
+    def forward(self, position=None):
+        """ Return next entry and make it current, or None at the end of history
+            Args:
+                position (tuple) = The scroll position of the current entry
+        """
+        return self.move(self.forwardEntries, self.backEntries, position)
+
+    def move(self, source, destination, position):
+        """ Move current entry onto destination and make the newest entry of source current """
+        if not source:
+            return None
+        if self.current:
+            self.leave(self.current, position)
+            destination.append(self.current)
+        self.current = source.pop()
+        self.compact()
+        return self.current
+
+    def leave(self, entry, position):
+        """ Record scroll position of an entry that stops being current
+            Args:
+                entry (obj) = The History_Entry being left
+                position (tuple) = Its scroll position
+        """
+        entry.position = position
+        # Album art may have been added while it was displayed
+        entry.size = None
+
+    def compact(self):
+        """ Drop the oldest entries above maxEntries and reduce all but the nearest
+            entries to their descriptors to stay within maxResident and maxBytes
+        """
+        for entries in (self.backEntries, self.forwardEntries):
+            while len(entries) > self.maxEntries:
+                entries.popleft()
+
+        resident = 1
+        residentBytes = self.entry_size(self.current) if self.current else 0
+        # Walk outward from the current entry, nearest first
+        for distance in range(1, max(len(self.backEntries), len(self.forwardEntries)) + 1):
+            for entries in (self.backEntries, self.forwardEntries):
+                if distance > len(entries):
+                    continue
+                entry = entries[-distance]
+                if entry.results is None:
+                    continue
+                size = self.entry_size(entry)
+                if resident < self.maxResident and residentBytes + size <= self.maxBytes:
+                    resident += 1
+                    residentBytes += size
+                else:
+                    entry.results = None
+
+        # Entries that cannot be rebuilt are of no use once compacted
+        for entries in (self.backEntries, self.forwardEntries):
+            if any(entry.results is None and entry.descriptor is None for entry in entries):
+                kept = [entry for entry in entries if entry.results is not None or entry.descriptor is not None]
+                entries.clear()
+                entries.extend(kept)
+
+    def entry_size(self, entry):
+        """ Return estimated size in bytes of entry's results, measured once
+            Args:
+                entry (obj) = The History_Entry to measure
+        """
+        if entry.results is None:
+            return 0
+        if entry.size is None:
+            entry.size = entry.results.estimate_size()
+        return entry.size
+
+    def __len__(self):
+        return len(self.backEntries) + len(self.forwardEntries) + (1 if self.current else 0)
@@ -0,0 +1,49 @@
+import requests
+
+from requests.adapters import HTTPAdapter
+
+
+class Http_Transport(object):
+
+    def __init__(self, poolConnections=4, poolSize=10, connectTimeout=5, readTimeout=15):
+        """ A pooled keep-alive HTTP session shared by the Spotify API client and the album art fetcher
+            Args:
+                poolConnections (int) = The number of hosts to keep a connection pool for
+                poolSize (int) = The max number of idle connections kept for each host
+                connectTimeout (float) = Seconds to wait for a connection
+                readTimeout (float) = Seconds to wait for a response once connected
+        """
+        self.timeout = (connectTimeout, readTimeout)
+        self.adapter = HTTPAdapter(pool_connections=poolConnections, pool_maxsize=poolSize)
+
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+    def get(self, url):
+        """ Return the body of a GET request
+            Args:
+                url (str) = The url to fetch
+        """
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+    def stats(self):
+        """ Return connections opened and requests sent for each host with a live connection pool """
+        stats = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = '{0}://{1}'.format(pool.scheme, pool.host)
+            hostStats = stats.setdefault(host, {'connections': 0, 'requests': 0, 'reused': 0})
+            hostStats['connections'] += pool.num_connections
+            hostStats['requests'] += pool.num_requests
+            hostStats['reused'] += max(pool.num_requests - pool.num_connections, 0)
+        return stats
+
+    def close(self):
+        """ Close pooled connections """
+        self.session.close()
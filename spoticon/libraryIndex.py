@@ -0,0 +1,425 @@
+import json
+import mmap
+import re
+import struct
+import threading
+import unicodedata
+
+from array import array
+from atomicFile import atomic_write
+from bisect import bisect_left, insort
+from collections import deque
+from records import record_from_dict
+
+
+MAGIC = b'SPLX'
+VERSION = 1
+
+# magic, version, record, token and posting counts, artist and album counts, and the byte
+# offsets of the record, token and posting offset tables, the postings and the record and
+# token text. Saved records are ordered artists, albums, then tracks, so each token's sorted
+# postings hold each category's ids together.
+HEADER = struct.Struct('<4s12I')
+
+# Field holding each category's unique id, and the fields whose words are indexed
+KEY_FIELDS = {'track': 'track_uri', 'album': 'album_id', 'artist': 'artist_id'}
+NAME_FIELDS = {'track': ('track_name', 'album_name', 'artist_name'), 'album': ('album_name',), 'artist': ('artist_name',)}
+RESULT_CATEGORIES = {'track': 'tracks', 'album': 'albums', 'artist': 'artists'}
+CATEGORY_ORDER = ('artist', 'album', 'track')
+
+# The same number of results full_search returns for each category
+DEFAULT_LIMITS = {'artists': 5, 'albums': 10, 'tracks': 50}
+
+# Records the background indexer indexes per hold of the lock, so a search never waits
+# more than about a millisecond behind it
+INDEX_CHUNK = 32
+
+# Key tokens start with a byte no word token starts with, so prefix searches never reach them
+KEY_PREFIX = b'\0'
+
+WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """ Return the lower case words of text with accents removed
+        Args:
+            text (str) = The text to split
+    """
+    if not text:
+        return []
+    if text.isascii():
+        return WORD.findall(text.lower())
+    text = unicodedata.normalize('NFKD', text.lower())
+    return WORD.findall(''.join(char for char in text if not unicodedata.combining(char)))
+
+
+def record_tokens(record):
+    """ Return the set of words indexed for a record
+        Args:
+            record (obj) = A track, album or artist record
+    """
+    tokens = set()
+    for field in NAME_FIELDS[record['category']]:
+        tokens.update(tokenize(record.get(field)))
+    return tokens
+
+
+class Token_View(object):
+
+    def __init__(self, text, offsets):
+        """ A read-only sorted sequence of the tokens in a memory-mapped index, for bisect
+            Args:
+                text (obj) = The token text section
+                offsets (obj) = The start of each token in text, plus the end of the last
+        """
+        self.text = text
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.text[self.offsets[i]:self.offsets[i + 1]])
+
+
+class Library_Index(object):
+
+    def __init__(self, path=None):
+        """ A local word and prefix index over every track, album and artist the app has
+            parsed, searchable without the network. Saved indexes are memory-mapped and
+            searched in place, records seen since are held in memory until save.
+            Args:
+                path (str) = Optional file to store the index in
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.file = None
+        self.map = None
+        self.views = []
+        self.diskRecords = 0
+        self.open_map()
+
+        # Records added since the index was loaded, their categories, and their words -> ids
+        # with the words also kept sorted for prefix lookups. Their ids follow on from the ids
+        # of the saved records.
+        self.pendingRecords = []
+        self.pendingCategories = []
+        self.pendingTokens = {}
+        self.pendingWords = []
+        self.pendingKeys = set()
+
+        # Parsed records waiting to be indexed. A background thread started by the first add
+        # indexes them a chunk at a time, so neither parsing nor searching waits on indexing.
+        # Records only leave the queue under lock, so a flush sees every record not yet indexed.
+        self.incoming = deque()
+        self.incomingReady = threading.Condition(threading.Lock())
+        self.indexer = None
+        self.stopping = False
+
+    def open_map(self):
+        """ Memory-map the saved index if there is one. Caller must hold lock or be __init__ """
+        try:
+            self.file = open(self.path, 'rb')
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (TypeError, IOError, OSError, ValueError):
+            # No path, no saved index, or an empty file
+            self.close_map()
+            return
+
+        header = HEADER.unpack_from(self.map)
+        if header[0] != MAGIC or header[1] != VERSION:
+            self.close_map()
+            return
+        (recordCount, tokenCount, postingCount, artistCount, albumCount, recordOffsets, tokenOffsets, postingOffsets, postings, recordText, tokenText) = header[2:]
+        view = memoryview(self.map)
+        self.recordOffsets = view[recordOffsets:recordOffsets + 4 * (recordCount + 1)].cast('I')
+        self.postingOffsets = view[postingOffsets:postingOffsets + 4 * (tokenCount + 1)].cast('I')
+        self.postings = view[postings:postings + 4 * postingCount].cast('I')
+        self.recordText = view[recordText:tokenText]
+        self.tokens = Token_View(view[tokenText:], view[tokenOffsets:tokenOffsets + 4 * (tokenCount + 1)].cast('I'))
+        self.views = [view, self.recordOffsets, self.postingOffsets, self.postings, self.recordText, self.tokens.text, self.tokens.offsets]
+        self.diskRecords = recordCount
+        self.diskCategories = {
+            'artist': (0, artistCount),
+            'album': (artistCount, artistCount + albumCount),
+            'track': (artistCount + albumCount, recordCount),
+        }
+
+    def close_map(self):
+        """ Release the memory-mapped index """
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        self.diskRecords = 0
+        self.diskCategories = {category: (0, 0) for category in CATEGORY_ORDER}
+        if self.map:
+            self.map.close()
+            self.map = None
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def __len__(self):
+        return self.diskRecords + len(self.pendingRecords)
+
+    def record_key(self, record):
+        """ Return the token identifying a record
+            Args:
+                record (obj) = A track, album or artist record
+        """
+        return KEY_PREFIX + '{0}:{1}'.format(record['category'], record[KEY_FIELDS[record['category']]]).encode('utf-8')
+
+    def disk_range(self, token):
+        """ Return the range of saved token numbers starting with token. Caller must hold lock
+            Args:
+                token (bytes) = The utf-8 encoded token prefix
+        """
+        if not self.diskRecords:
+            return (0, 0)
+        # utf-8 text never contains 0xff, so it sorts after every token starting with token
+        return (bisect_left(self.tokens, token), bisect_left(self.tokens, token + b'\xff'))
+
+    def contains(self, key):
+        """ Return whether a record key is already indexed. Caller must hold lock
+            Args:
+                key (bytes) = The record key token
+        """
+        if key in self.pendingKeys:
+            return True
+        (lo, hi) = self.disk_range(key)
+        return lo < hi and self.tokens[lo] == key
+
+    def add(self, records):
+        """ Queue tracks, albums and artists to be indexed if they are not indexed yet
+            Args:
+                records (array) = Parsed result records of any category
+        """
+        with self.incomingReady:
+            self.incoming.extend(records)
+            if self.indexer is None and not self.stopping:
+                self.indexer = threading.Thread(target=self.index_incoming, name='library-indexer', daemon=True)
+                self.indexer.start()
+            self.incomingReady.notify()
+
+    def index_incoming(self):
+        """ Index queued records as they arrive, until stopped """
+        while True:
+            with self.incomingReady:
+                while not self.incoming and not self.stopping:
+                    self.incomingReady.wait()
+                if self.stopping:
+                    return
+            with self.lock:
+                self.index_records(self.take_incoming(INDEX_CHUNK))
+
+    def stop(self):
+        """ Stop the indexing thread. Queued records are indexed by the next flush """
+        with self.incomingReady:
+            self.stopping = True
+            indexer = self.indexer
+            self.incomingReady.notify()
+        if indexer:
+            indexer.join()
+
+    def take_incoming(self, limit=None):
+        """ Remove and return queued records, oldest first. Caller must hold lock
+            Args:
+                limit (int) = The max number of records to take, or None for all of them
+        """
+        with self.incomingReady:
+            if limit is None or limit >= len(self.incoming):
+                (records, self.incoming) = (self.incoming, deque())
+                return records
+            return [self.incoming.popleft() for i in range(limit)]
+
+    def flush(self):
+        """ Index all queued records now. Caller must hold lock """
+        self.index_records(self.take_incoming())
+
+    def index_records(self, records):
+        """ Index records that are not indexed yet. Caller must hold lock
+            Args:
+                records (array) = Parsed result records of any category
+        """
+        for record in records:
+            if record['category'] not in KEY_FIELDS or not record.get(KEY_FIELDS[record['category']]):
+                continue
+            key = self.record_key(record)
+            if self.contains(key):
+                continue
+            recordId = len(self)
+            fields = record.to_dict()
+            # Album art is rendered per session and cached separately
+            fields.pop('album_art', None)
+            self.pendingRecords.append(json.dumps(fields, separators=(',', ':')).encode('utf-8'))
+            self.pendingCategories.append(record['category'])
+            self.pendingKeys.add(key)
+            for token in record_tokens(record):
+                word = token.encode('utf-8')
+                ids = self.pendingTokens.get(word)
+                if ids is None:
+                    ids = self.pendingTokens[word] = []
+                    insort(self.pendingWords, word)
+                ids.append(recordId)
+
+    def pending_words(self, token):
+        """ Return the words added since loading which start with token. Caller must hold lock
+            Args:
+                token (bytes) = The utf-8 encoded token prefix
+        """
+        return self.pendingWords[bisect_left(self.pendingWords, token):bisect_left(self.pendingWords, token + b'\xff')]
+
+    def load_record(self, recordId):
+        """ Return a record by id. Caller must hold lock
+            Args:
+                recordId (int) = The record's id
+        """
+        if recordId < self.diskRecords:
+            data = self.recordText[self.recordOffsets[recordId]:self.recordOffsets[recordId + 1]]
+        else:
+            data = self.pendingRecords[recordId - self.diskRecords]
+        return record_from_dict(json.loads(bytes(data)))
+
+    def count(self, token):
+        """ Return the number of record ids listed under words starting with token. Caller must hold lock
+            Args:
+                token (bytes) = The utf-8 encoded word prefix
+        """
+        (lo, hi) = self.disk_range(token)
+        count = self.postingOffsets[hi] - self.postingOffsets[lo] if lo < hi else 0
+        return count + sum(len(self.pendingTokens[word]) for word in self.pending_words(token))
+
+    def ids(self, token):
+        """ Return the set of ids of records listed under words starting with token. Caller must hold lock
+            Args:
+                token (bytes) = The utf-8 encoded word prefix
+        """
+        (lo, hi) = self.disk_range(token)
+        ids = set(self.postings[self.postingOffsets[lo]:self.postingOffsets[hi]]) if lo < hi else set()
+        for word in self.pending_words(token):
+            ids.update(self.pendingTokens[word])
+        return ids
+
+    def category_ids(self, token, category):
+        """ Yield the ids of records of a category listed under words starting with token.
+            Caller must hold lock
+            Args:
+                token (bytes) = The utf-8 encoded word prefix
+                category (str) = The record category
+        """
+        (first, last) = self.diskCategories[category]
+        (lo, hi) = self.disk_range(token)
+        for i in range(lo, hi):
+            postings = self.postings[self.postingOffsets[i]:self.postingOffsets[i + 1]]
+            yield from postings[bisect_left(postings, first):bisect_left(postings, last)]
+        for word in self.pending_words(token):
+            for recordId in self.pendingTokens[word]:
+                if self.pendingCategories[recordId - self.diskRecords] == category:
+                    yield recordId
+
+    def search(self, query, limits=DEFAULT_LIMITS):
+        """ Return indexed artists, albums and tracks with a word starting with each word of query.
+            Records still queued for the background indexer are not searched yet.
+            Args:
+                query (str) = The query string
+                limits (obj) = Result category name -> the max number of results
+        """
+        results = {category: [] for category in limits}
+        tokens = [token.encode('utf-8') for token in set(tokenize(query))]
+        if not tokens:
+            return results
+
+        with self.lock:
+            # Walk the ids of the rarest word and check them against the ids of the others
+            counts = {token: self.count(token) for token in tokens}
+            rarest = min(tokens, key=counts.get)
+            others = [self.ids(token) for token in tokens if token != rarest]
+            for category in CATEGORY_ORDER:
+                lines = results.get(RESULT_CATEGORIES[category])
+                if lines is None:
+                    continue
+                limit = limits[RESULT_CATEGORIES[category]]
+                seen = set()
+                for recordId in self.category_ids(rarest, category):
+                    if len(lines) >= limit:
+                        break
+                    if recordId in seen or not all(recordId in ids for ids in others):
+                        continue
+                    seen.add(recordId)
+                    lines.append(self.load_record(recordId))
+        return results
+
+    def save(self):
+        """ Merge records added this session into the index file """
+        if not self.path:
+            return
+        with self.lock:
+            self.flush()
+            if not self.pendingRecords:
+                return
+
+            # Saved records stay grouped by category, so new ids are assigned category by category
+            categories = [category for category in CATEGORY_ORDER for i in range(*self.diskCategories[category])]
+            categories += self.pendingCategories
+            order = sorted(range(len(categories)), key=lambda recordId: CATEGORY_ORDER.index(categories[recordId]))
+            newIds = [0] * len(order)
+            for (newId, recordId) in enumerate(order):
+                newIds[recordId] = newId
+
+            records = [self.recordText[self.recordOffsets[i]:self.recordOffsets[i + 1]] for i in range(self.diskRecords)]
+            records += self.pendingRecords
+            records = [bytes(records[recordId]) for recordId in order]
+            tokens = {}
+            for i in range(len(self.tokens) if self.diskRecords else 0):
+                tokens[self.tokens[i]] = [newIds[recordId] for recordId in self.postings[self.postingOffsets[i]:self.postingOffsets[i + 1]]]
+            for (token, ids) in self.pendingTokens.items():
+                tokens.setdefault(token, []).extend(newIds[recordId] for recordId in ids)
+            for key in self.pendingKeys:
+                tokens[key] = []
+            counts = [categories.count(category) for category in CATEGORY_ORDER]
+            self.write(records, tokens, counts)
+
+            self.close_map()
+            self.pendingRecords = []
+            self.pendingCategories = []
+            self.pendingTokens = {}
+            self.pendingWords = []
+            self.pendingKeys = set()
+            self.open_map()
+
+    def write(self, records, tokens, counts):
+        """ Write an index file. Caller must hold lock
+            Args:
+                records (array) = The utf-8 JSON text of each record, artists then albums then tracks
+                tokens (obj) = utf-8 token -> ids of the records containing it
+                counts (array) = The number of artists, albums and tracks
+        """
+        sortedTokens = sorted(tokens)
+        recordOffsets = array('I', [0])
+        for record in records:
+            recordOffsets.append(recordOffsets[-1] + len(record))
+        tokenOffsets = array('I', [0])
+        postingOffsets = array('I', [0])
+        postings = array('I')
+        for token in sortedTokens:
+            tokenOffsets.append(tokenOffsets[-1] + len(token))
+            postings.extend(sorted(tokens[token]))
+            postingOffsets.append(len(postings))
+
+        sections = [recordOffsets.tobytes(), tokenOffsets.tobytes(), postingOffsets.tobytes(), postings.tobytes(), b''.join(records), b''.join(sortedTokens)]
+        offsets = []
+        position = HEADER.size
+        for section in sections:
+            offsets.append(position)
+            position += len(section)
+
+        header = HEADER.pack(MAGIC, VERSION, len(records), len(sortedTokens), len(postings), counts[0], counts[1], *offsets)
+        atomic_write(self.path, [header] + sections)
+
+    def close(self):
+        """ Stop indexing, save the index and release the file """
+        self.stop()
+        self.save()
+        with self.lock:
+            self.close_map()
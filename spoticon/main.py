@@ -1,21 +1,43 @@
+import argparse
 import sys
 import curses
 import threading, time
 import os.path as path
 
+from functools import partial
+
+from artCache import Art_Cache
+from dispatcher import Command_Dispatcher
+from playerBackends import Fake_Backend
+from history import History_Entry, History_Store
+from metrics import METRICS
+from httpTransport import Http_Transport
 from playQueue import PlayQueue
+from profiler import Sampling_Profiler
+from resultSet import Result_Set
 from screens import Results_Window, Now_Playing_Window, Help_Window, Input_Window, Message_Window
+from requestScheduler import Request_Scheduler
 from spotifyModel import Spotify_Model
 from spotifyPlayer import Spotify_Player
+from trackScheduler import Track_Advance_Scheduler
 from webserver import Web_Server
 
 class Spoticon(object):
 
-    def __init__(self, stdScreen):
-        """ Controller for Spoticon program """
+    def __init__(self, stdScreen, config=None, spotifyModel=None, spotifyPlayer=None, transport=None, profiler=None):
+        """ Controller for Spoticon program
+            Args:
+                stdScreen (obj) = The curses screen to draw on
+                config (obj) = Settings to use instead of the parsed .spoticonrc
+                spotifyModel (obj) = The Spotify_Model to use instead of one made from config
+                spotifyPlayer (obj) = The Spotify_Player to use instead of one made from config
+                transport (obj) = The Http_Transport to use instead of one made from config
+                profiler (obj) = Optional Sampling_Profiler to start and stop from the keyboard
+        """
 
         self.commands = {
             ord('s'): self.search,
+            ord('/'): self.search_as_you_type,
             ord('\n'): self.activate_selected_line,
             ord(' '): self.play_pause,
             ord('j'): self.move_up,
@@ -32,53 +54,106 @@ class Spoticon(object):
             ord('C'): self.playQueue_clear_playQueue,
             ord('+'): self.playQueue_add_highlighted_track,
             ord('.'): self.playQueue_add_all_tracks,
+            ord('n'): self.playQueue_insert_highlighted_track,
+            ord('x'): self.playQueue_remove_highlighted_track,
+            ord('z'): self.playQueue_toggle_shuffle,
             ord('q'): self.display_playQueue,
             ord('p'): self.open_my_playlists,
             ord('?'): self.toggle_helpWindow,
+            ord('m'): self.toggle_metrics,
+            ord('P'): self.toggle_profiler,
             curses.KEY_RESIZE: self.resize_windows,
         }
 
-        self.config = self.parse_rc()
+        self.config = config or self.parse_rc()
+        self.profiler = profiler
+        self.dispatcher = Command_Dispatcher()
+        self.loading = False
+
+        # Whether the performance overlay is shown, and when it was last drawn
+        self.metricsShown = False
+        self.metricsDrawn = 0
+
+        # The latest search-as-you-type query, and the one being fetched
+        self.typedQuery = None
+        self.typedSearch = None
 
-        self.playQueue = PlayQueue()
-        self.spotifyPlayer = Spotify_Player()
-        self.spotifyModel = Spotify_Model(auth=self.config['auth'])
+        self.playQueue = PlayQueue(journalPath=self.cache_file('queue.journal'))
+        self.spotifyPlayer = spotifyPlayer or Spotify_Player(backend=Fake_Backend() if self.config['player_backend'] == 'fake' else None)
+        self.transport = transport or Http_Transport(connectTimeout=self.config['http_timeout'], readTimeout=3 * self.config['http_timeout'])
+        self.spotifyModel = spotifyModel or Spotify_Model(auth=self.config['auth'], transport=self.transport, scheduler=Request_Scheduler(rate=self.config['api_rate'], burst=self.config['api_burst']), cachePath=self.cache_file('responses.json'), libraryPath=self.cache_file('library.idx'), offline=self.config['offline'])
 
         self.stdScreen = stdScreen
         self.resize_windows()
-        self.resultsWindow = Results_Window(self.stdScreen, self.resultsWindowHeight, self.resultsWindowWidth, self.resultsWindowY, self.resultsWindowX)
+        self.artCache = Art_Cache(self.cache_file('art')) if self.config['cache_dir'] else None
+        self.resultsWindow = Results_Window(self.stdScreen, self.resultsWindowHeight, self.resultsWindowWidth, self.resultsWindowY, self.resultsWindowX, artCache=self.artCache, transport=self.transport)
         self.nowplayingWindow = Now_Playing_Window(self.stdScreen, self.nowplayingWindowHeight, self.nowplayingWindowWidth, self.nowplayingWindowY, self.nowplayingWindowX)
         self.helpWindow = Help_Window(self.stdScreen, self.helpWindowHeight, self.helpWindowWidth, self.helpWindowY, self.helpWindowX)
 
-        curses.noecho()
-        curses.cbreak()
-        curses.curs_set(0)
         self.stdScreen.keypad(1)
 
         self.nowPlaying = None
         self.repeatOneSong = False
         self.results = []
-        self.backHistory = []
-        self.forwardHistory = []
+        self.history = History_Store()
 
         # Thread to listen for track change
+        self.trackScheduler = Track_Advance_Scheduler()
         self.playerListenerThread = threading.Thread(target=self.listen_for_track_advance)
         self.playerListenerThread.setDaemon(True)
         self.playerListenerThread.start()
-        self.pauseCount = 0
 
         self.helpWindow.draw_screen()
-        self.listen_for_commands()
 
     def listen_for_commands(self):
         """ Listen and interpret user commands """
+        # Wake up regularly to draw background work that has finished
+        self.stdScreen.timeout(50)
         while True:
             charInput = self.stdScreen.getch()
-            if charInput in self.commands:
-                self.commands[charInput]()
-            elif charInput == 27:
+            if charInput == 27:
                 self.quit()
                 break
+            self.handle_key(charInput)
+
+    def handle_key(self, charInput):
+        """ Run the command for a key press, then show background work that has finished
+            Args:
+                charInput (int) = The key pressed, or -1 if the input timeout passed without one
+        """
+        if charInput == -1:
+            if not self.helpWindow and self.resultsWindow.album_art_ready():
+                self.resultsWindow.draw_screen()
+        elif charInput in self.commands:
+            self.commands[charInput]()
+        self.dispatcher.drain()
+        self.show_loading()
+        if self.metricsShown and time.monotonic() - self.metricsDrawn >= 0.5:
+            self.draw_metrics()
+
+    def show_loading(self):
+        """ Show loading indicator while network requests are in flight """
+        loading = self.dispatcher.busy()
+        if loading != self.loading:
+            self.loading = loading
+            self.nowplayingWindow.set_loading(loading)
+
+    def navigate(self, task, *args, **kwargs):
+        """ Fetch results in the background and display them when they arrive. Any
+            navigation still pending is cancelled or has its result dropped.
+            Args:
+                task (func) = The Spotify_Model method returning results
+        """
+        descriptor = {'method': task.__name__, 'args': args, 'kwargs': kwargs}
+        self.dispatcher.submit('navigation', partial(task, *args, **kwargs), lambda results: self.update(results, descriptor), self.navigation_failed)
+        self.show_loading()
+
+    def navigation_failed(self, error):
+        """ Report a failed background request
+            Args:
+                error (Exception) = The exception raised by the request
+        """
+        self.flash_message('Could not reach Spotify', 0.5)
 
     def resize_windows(self):
         """ Ensure Curses screen size """
@@ -111,40 +186,80 @@ class Spoticon(object):
             self.helpWindowX = int(width * .16)
             self.helpWindowY = int(height * .16)
 
+            if getattr(self, 'resultsWindow', None):
+                self.resultsWindow.resize(self.resultsWindowHeight, self.resultsWindowWidth, self.resultsWindowY, self.resultsWindowX)
+                self.nowplayingWindow.resize(self.nowplayingWindowHeight, self.nowplayingWindowWidth, self.nowplayingWindowY, self.nowplayingWindowX)
+                self.nowplayingWindow.draw_screen(track=self.nowPlaying)
+                if self.helpWindow:
+                    self.helpWindow.resize(self.helpWindowHeight, self.helpWindowWidth, self.helpWindowY, self.helpWindowX)
+                self.refresh_windows()
+
     def refresh_windows(self):
-        if self.resultsWindow: self.resultsWindow.draw_screen()
+        # Overlay windows share cells with the results window, so redraw it in full
+        if self.resultsWindow:
+            self.resultsWindow.invalidate()
+            self.resultsWindow.draw_screen()
         if self.nowplayingWindow: self.nowplayingWindow.draw_screen()
         if self.helpWindow: self.helpWindow.draw_screen()
 
     def listen_for_track_advance(self):
-        """ Listen for Spotify Player state """
-        playerState = self.spotifyPlayer.get_player_state()
-        playerPosition = self.spotifyPlayer.get_player_position()
-        if (playerState == 'paused' or playerState == 'stopped') and playerPosition == '0.0':
-            if self.nowPlaying and self.repeatOneSong:
-                self.play_track(self.nowPlaying)
-            elif self.pauseCount > 2:
-                self.playQueue_play_next()
-            else:
-                self.pauseCount += 1
-        else:
-            self.pauseCount = 0
-        time.sleep(.5)
-
-    def update(self, results):
-        """ Add curent results to backHistory replace with new results
+        """ Listen for Spotify Player state and advance the queue when the playing track ends """
+        while True:
+            status = self.spotifyPlayer.get_status()
+            if self.trackScheduler.observe(status):
+                # Hand over to the UI thread, which owns the curses windows
+                if self.nowPlaying and self.repeatOneSong:
+                    self.dispatcher.call_soon(self.play_track, self.nowPlaying)
+                else:
+                    self.dispatcher.call_soon(self.playQueue_play_next)
+            self.trackScheduler.wait()
+
+    def update(self, results, descriptor=None, replace=False, position=None):
+        """ Add curent results to history and replace with new results
             Args:
                 results (obj) = The new results to display
+                descriptor (obj) = How to fetch the results again if they are dropped from history
+                replace (boolean) = Whether to replace the current history entry instead of adding one
+                position (tuple) = Optional scroll position to show the new results at
         """
         if self.helpWindow:
             del self.helpWindow.win
             self.helpWindow = None
-        if self.results:
-            self.backHistory.append(self.results)
-        self.results = results
-        self.resultsWindow.draw_screen(lines=self.results)
+        self.results = Result_Set(results)
+        if replace:
+            self.history.replace(History_Entry(self.results, descriptor))
+        else:
+            self.history.visit(History_Entry(self.results, descriptor), self.resultsWindow.get_position())
+        self.resultsWindow.draw_screen(lines=self.results, position=position)
         self.nowplayingWindow.draw_screen()
 
+    def show_history_entry(self, entry):
+        """ Display a history entry at its saved scroll position, rebuilding its results if they were compacted
+            Args:
+                entry (obj) = The History_Entry to display
+        """
+        if entry.results is not None:
+            self.results = entry.results
+            self.resultsWindow.draw_screen(self.results, position=entry.position)
+            return
+
+        def rehydrated(results):
+            entry.results = Result_Set(results)
+            if self.history.current is entry:
+                self.show_history_entry(entry)
+
+        self.dispatcher.submit('navigation', partial(self.rehydrate, entry.descriptor), rehydrated, self.navigation_failed)
+        self.show_loading()
+
+    def rehydrate(self, descriptor):
+        """ Return results fetched again from a history descriptor
+            Args:
+                descriptor (obj) = The query method name, args and kwargs
+        """
+        if descriptor['method'] == 'queue':
+            return {'tracks': self.playQueue.playQueue}
+        return getattr(self.spotifyModel, descriptor['method'])(*descriptor['args'], **descriptor['kwargs'])
+
     def search(self):
         """ Get user input from search screen, query Spotify API, and update results """
         inputWindow = Input_Window(self.stdScreen, self.inputWindowHeight, self.inputWindowWidth, self.inputWindowY, self.inputWindowX)
@@ -154,18 +269,102 @@ class Spoticon(object):
             if self.helpWindow:
                 del self.helpWindow.win
                 self.helpWindow = None
-            results = self.spotifyModel.full_search(query)
-            self.update(results)
+            self.refresh_windows()
+            self.search_library(query)
         else:
             self.refresh_windows()
 
+    def search_library(self, query):
+        """ Show local index matches for query at once, then replace them with the
+            full search results when they arrive
+            Args:
+                query (str) = The query string
+        """
+        local = self.spotifyModel.local_search(query)
+        if not any(local.values()):
+            self.navigate(self.spotifyModel.full_search, query)
+            return
+
+        descriptor = {'method': 'full_search', 'args': (query,), 'kwargs': {}}
+        self.update(local, descriptor)
+        preview = self.history.current
+
+        def searched(results):
+            if self.history.current is preview:
+                self.update(results, descriptor, replace=True)
+            else:
+                # Navigated away within history, keep full results for coming back
+                preview.results = Result_Set(results)
+                preview.size = None
+
+        self.dispatcher.submit('navigation', partial(self.spotifyModel.full_search, query), searched, self.navigation_failed)
+        self.show_loading()
+
+    def search_as_you_type(self):
+        """ Show results while the query is typed, keeping the final results on enter key-press """
+        if self.helpWindow:
+            del self.helpWindow.win
+            self.helpWindow = None
+        inputWindow = Input_Window(self.stdScreen, self.inputWindowHeight, self.inputWindowWidth, self.inputWindowY, self.inputWindowX)
+        query = inputWindow.get_incremental_input('SEARCH: ', self.type_query, self.dispatcher.drain, debounce=self.config['search_debounce'])
+        self.typedQuery = None
+
+        if query and len(query) > 2:
+            self.refresh_windows()
+            self.search_library(query)
+        else:
+            if self.history.current:
+                self.show_history_entry(self.history.current)
+            self.refresh_windows()
+
+    def type_query(self, query):
+        """ Show local matches for a partly typed query and fetch its full results, at most
+            one query at a time. Results of queries typed over while in flight are dropped.
+            Args:
+                query (str) = The query string
+        """
+        if len(query) <= 2:
+            return
+        self.typedQuery = query
+        self.show_typed_results(self.spotifyModel.local_search(query))
+        if not self.typedSearch:
+            self.fetch_typed_query(query)
+
+    def fetch_typed_query(self, query):
+        """ Fetch results for a typed query, then the newest query typed meanwhile
+            Args:
+                query (str) = The query string
+        """
+        def fetched(results):
+            self.typedSearch = None
+            if query == self.typedQuery:
+                self.show_typed_results(results)
+            elif self.typedQuery:
+                self.fetch_typed_query(self.typedQuery)
+
+        def failed(error):
+            self.typedSearch = None
+            if self.typedQuery and query != self.typedQuery:
+                self.fetch_typed_query(self.typedQuery)
+
+        self.typedSearch = query
+        self.dispatcher.submit('typing', partial(self.spotifyModel.prefix_search, query), fetched, failed)
+
+    def show_typed_results(self, results):
+        """ Draw search-as-you-type results without adding them to history
+            Args:
+                results (obj) = Result category name -> array of result lines
+        """
+        if any(results.values()):
+            self.resultsWindow.draw_screen(lines=Result_Set(results))
+
     def open_artist(self, artist):
         """ Get and update results with tracks/albums from artist
             Args:
                 artist (obj) = An artist object
         """
         if artist and 'artist_id' in artist:
-            self.update(self.spotifyModel.get_artist(artist['artist_id']))
+            self.navigate(self.spotifyModel.get_artist, artist['artist_id'])
 
     def get_track_album(self):
         """ Open album of track """
@@ -182,20 +381,20 @@ class Spoticon(object):
         """
         if item and 'album_id' in item:
             name = item['album_name'] if 'album_name' in item else ''
-            self.update(self.spotifyModel.get_album(item['album_id'], album_name=name))
+            self.navigate(self.spotifyModel.get_album, item['album_id'], album_name=name)
         else:
             self.flash_message('Cannot open album', 0.5)
 
     def open_my_playlists(self):
         """ Search for user playlists and update results """
-        self.update(self.spotifyModel.get_my_playlists())
+        self.navigate(self.spotifyModel.get_my_playlists)
 
     def open_playlist(self, playlist):
         """ Get and update results with tracks from playlist
             Args:
                 playlist (obj) = The highlighted line
         """
-        self.update(self.spotifyModel.get_playlist(playlist))
+        self.navigate(self.spotifyModel.get_playlist, playlist)
 
     def play_track(self, track):
         """ Play track
@@ -206,6 +405,7 @@ class Spoticon(object):
         if track and 'track_uri' in track:
             self.nowPlaying = track
             self.spotifyPlayer.play_track(track['track_uri'])
+            self.trackScheduler.expect(track)
             self.nowplayingWindow.draw_screen(track=track)
 
     def activate_selected_line(self):
@@ -227,6 +427,7 @@ class Spoticon(object):
     def play_pause(self):
         """ Toggle Spotify Player play/pause """
         self.spotifyPlayer.play_pause()
+        self.trackScheduler.wake()
         self.flash_message('Play/Pause Spotify Player', 0.5)
 
     def move_up(self):
@@ -272,18 +473,41 @@ class Spoticon(object):
     def playQueue_add_highlighted_track(self):
         """ Add current line item track to the Spoticon queue """
         line = self.resultsWindow.get_highlighted_line()
-        if line['category'] == 'track':
-            self.playQueue.add_track(line)
+        if line and line['category'] == 'track':
+            if not self.playQueue.add_track(line):
+                self.flash_message('Track already queued', 0.5)
 
     def playQueue_add_all_tracks(self):
         """ Add all tracks on screen to the Spoticon queue """
-        self.playQueue.add_tracks(self.results['tracks'])
+        if not self.playQueue.add_tracks(self.results['tracks']):
+            self.flash_message('Tracks already queued', 0.5)
+
+    def playQueue_insert_highlighted_track(self):
+        """ Add current line item track to the Spoticon queue to play next """
+        line = self.resultsWindow.get_highlighted_line()
+        if line and line['category'] == 'track':
+            if not self.playQueue.insert_next_track(line):
+                self.flash_message('Track already queued', 0.5)
+
+    def playQueue_remove_highlighted_track(self):
+        """ Remove current line item track from the Spoticon queue """
+        line = self.resultsWindow.get_highlighted_line()
+        if line and line['category'] == 'track' and self.playQueue.remove_track(line['track_uri']):
+            if self.history.current and self.history.current.descriptor == {'method': 'queue'}:
+                # Redraw the queue in place, keeping the highlight on the same row
+                self.update({'tracks': self.playQueue.playQueue}, {'method': 'queue'}, replace=True, position=self.resultsWindow.get_position())
+            else:
+                self.flash_message('Removed track from queue', 0.5)
+
+    def playQueue_toggle_shuffle(self):
+        """ Toggle shuffled play order of the Spoticon queue """
+        self.flash_message('Shuffle on' if self.playQueue.toggle_shuffle() else 'Shuffle off', 0.5)
 
     def display_playQueue(self):
         """ Show tracks in Spoticon queue on screen """
         results = {}
         results['tracks'] = self.playQueue.playQueue
-        self.update(results)
+        self.update(results, {'method': 'queue'})
 
     def flash_message(self, message, time):
         """ Display message in message screen
@@ -305,18 +529,15 @@ class Spoticon(object):
 
     def forward_history(self):
         """ Display next step in forward history on main screen """
-        if self.forwardHistory:
-            self.backHistory.append(self.results)
-            self.results = self.forwardHistory.pop()
-            self.resultsWindow.draw_screen(self.results)
-
+        entry = self.history.forward(self.resultsWindow.get_position())
+        if entry:
+            self.show_history_entry(entry)
 
     def back_history(self):
         """ Display previous screen on main screen """
-        if self.backHistory:
-            self.forwardHistory.append(self.results)
-            self.results = self.backHistory.pop()
-            self.resultsWindow.draw_screen(self.results)
+        entry = self.history.back(self.resultsWindow.get_position())
+        if entry:
+            self.show_history_entry(entry)
 
     def toggle_helpWindow(self):
         """ Toggle help screen """
@@ -329,6 +550,84 @@ class Spoticon(object):
             self.helpWindow = Help_Window(self.stdScreen, self.helpWindowHeight, self.helpWindowWidth, self.helpWindowY, self.helpWindowX)
             self.helpWindow.draw_screen()
 
+    def toggle_metrics(self):
+        """ Toggle the performance overlay """
+        self.metricsShown = not self.metricsShown
+        if self.metricsShown:
+            self.draw_metrics()
+        else:
+            self.nowplayingWindow.set_overlay(None)
+
+    def toggle_profiler(self):
+        """ Start or stop sampling stacks, writing the profile each time it stops """
+        if not self.profiler:
+            self.flash_message('Start Spoticon with --profile <file> to profile', 1)
+        elif not self.profiler.running:
+            self.profiler.start()
+            self.flash_message('Profiling', 0.5)
+        else:
+            self.profiler.stop()
+            if self.write_profile():
+                self.flash_message('Profile of {0} samples written to {1}'.format(self.profiler.samples, self.profiler.path), 1)
+
+    def write_profile(self):
+        """ Write the sampled stacks to the profile file, showing why if that fails. Return whether it was written """
+        try:
+            self.profiler.write()
+            return True
+        except (IOError, OSError) as error:
+            if getattr(self, 'messageWindowHeight', None):
+                self.flash_message('Could not write profile {0}: {1}'.format(self.profiler.path, error.strerror or error), 1)
+            return False
+
+    def draw_metrics(self):
+        """ Draw live latency percentiles and hit rates in the performance overlay """
+        self.metricsDrawn = time.monotonic()
+        self.nowplayingWindow.set_overlay(self.metrics_lines())
+
+    def metrics_lines(self):
+        """ Return the performance overlay text: the p50/p99 latency of searches, API requests,
+            player commands, album art and drawing, then cache hit rates and request counts
+        """
+        timings = []
+        for (name, label) in (('model.search', 'search'), ('api.request', 'api'), ('player.get_status', 'player'), ('art.asciinator', 'art'), ('screen.draw', 'draw')):
+            percentiles = METRICS.percentiles(name)
+            timings.append('{0} {1}'.format(label, '/'.join('{0:.1f}'.format(seconds * 1000) for seconds in percentiles) if percentiles else '-'))
+
+        counters = self.metrics_counters()
+        hits = ['responses {0:.0%}'.format(counters['responses']['hit_rate'])]
+        if 'art' in counters:
+            hits.append('art {0:.0%}'.format(counters['art']['hit_rate']))
+        requests = sum(host['requests'] for host in counters['transport'].values())
+        reused = sum(host['reused'] for host in counters['transport'].values())
+        if requests:
+            hits.append('connections {0:.0%}'.format(reused / requests))
+        scheduler = counters['scheduler']
+        return [
+            'p50/p99 ms  ' + '  '.join(timings),
+            'hit rates  {0}  api {1} throttled {2}'.format('  '.join(hits), scheduler['started'], scheduler['throttled']),
+        ]
+
+    def metrics_counters(self):
+        """ Return the stats of the response cache, art cache, connection pools and request scheduler """
+        counters = {
+            'responses': self.spotifyModel.cache.stats(),
+            'transport': self.transport.stats(),
+            'scheduler': self.spotifyModel.scheduler.stats(),
+        }
+        if getattr(self, 'artCache', None):
+            counters['art'] = self.artCache.stats()
+        return counters
+
+    def cache_file(self, name):
+        """ Return path for a file in the cache directory or None if disk caching is off
+            Args:
+                name (str) = The file name
+        """
+        if self.config['cache_dir']:
+            return path.join(self.config['cache_dir'], name)
+        return None
+
     def parse_rc(self):
         """ Return parsed .spoticonrc file if one exists """
         defaultAuth = { 
@@ -337,7 +636,7 @@ class Spoticon(object):
             'client_secret': None,
             'redirect_uri': None 
         }
-        config = { 'auth': defaultAuth }
+        config = { 'auth': defaultAuth, 'cache_dir': path.expanduser('~/.spoticon'), 'player_backend': 'applescript', 'offline': False, 'search_debounce': 0.15, 'http_timeout': 5, 'api_rate': 20, 'api_burst': 100 }
         try:
             with open(path.expanduser("~/.spoticonrc")) as rc:
                 lines = rc.readlines()
@@ -351,18 +650,93 @@ class Spoticon(object):
                         config['auth']['client_secret'] = words[1].strip('\n')
                     elif words[0] == 'redirect_uri':
                         config['auth']['redirect_uri'] = words[1].strip('\n')
+                    elif words[0] == 'cache_dir':
+                        cacheDir = words[1].strip('\n')
+                        config['cache_dir'] = None if cacheDir == 'none' else path.expanduser(cacheDir)
+                    elif words[0] == 'player_backend':
+                        config['player_backend'] = words[1].strip('\n')
+                    elif words[0] == 'offline':
+                        config['offline'] = words[1].strip('\n') in ('true', 'yes', 'on')
+                    elif words[0] == 'search_debounce':
+                        # Milliseconds, optionally with an ms suffix. Unreadable values keep the default
+                        debounce = words[1].strip()
+                        try:
+                            config['search_debounce'] = max(float(debounce[:-2] if debounce.endswith('ms') else debounce), 0) / 1000
+                        except ValueError:
+                            pass
+                    elif words[0] == 'http_timeout':
+                        # Seconds. Unreadable or non-positive values keep the default
+                        try:
+                            timeout = float(words[1].strip())
+                        except ValueError:
+                            continue
+                        if timeout > 0:
+                            config['http_timeout'] = timeout
+                    elif words[0] in ('api_rate', 'api_burst'):
+                        # Requests per second, and requests started at once. Unreadable or non-positive values keep the default
+                        try:
+                            limit = float(words[1].strip())
+                        except ValueError:
+                            continue
+                        if limit > 0:
+                            config[words[0]] = limit if words[0] == 'api_rate' else max(int(limit), 1)
         except IOError:
             pass
         return config
 
     def quit(self, message=''):
         """ Gracefully quit program """
+        self.close()
         curses.endwin()
         if message: print(message)
         sys.exit()
 
-
-def run():
+    def close(self):
+        """ Stop background work, save the metrics, caches and profile and release the player and connections """
+        if getattr(self, 'profiler', None):
+            self.profiler.stop()
+        metricsPath = self.cache_file('metrics.json') if getattr(self, 'config', None) else None
+        if metricsPath and getattr(self, 'spotifyModel', None) and getattr(self, 'transport', None):
+            try:
+                METRICS.save(metricsPath, self.metrics_counters())
+            except (IOError, OSError):
+                pass
+        if getattr(self, 'dispatcher', None):
+            self.dispatcher.shutdown()
+        if getattr(self, 'spotifyModel', None):
+            self.spotifyModel.save_cache()
+        if getattr(self, 'spotifyPlayer', None):
+            self.spotifyPlayer.close()
+        if getattr(self, 'playQueue', None):
+            self.playQueue.close()
+        if getattr(self, 'transport', None):
+            self.transport.close()
+        if getattr(self, 'profiler', None):
+            self.write_profile()
+
+
+def start(stdScreen, profiler=None):
+    """ Set up the terminal and listen for commands
+        Args:
+            stdScreen (obj) = The curses screen from curses.wrapper
+            profiler (obj) = Optional Sampling_Profiler to run during the session
+    """
+    curses.noecho()
+    curses.cbreak()
+    curses.curs_set(0)
+    if profiler:
+        profiler.start()
+    Spoticon(stdScreen, profiler=profiler).listen_for_commands()
+
+
+def run(argv=None):
     """ Call Spoticon class with automatically passed curses object """
-
-    curses.wrapper(Spoticon)
+    parser = argparse.ArgumentParser(prog='spoticon', description='A mouseless Spotify UI in your terminal')
+    parser.add_argument('--profile', metavar='FILE', help='sample stacks of all threads and write them to FILE as collapsed stacks for a flame graph. P stops and starts sampling')
+    parser.add_argument('--profile-rate', type=float, default=100, metavar='HZ', help='samples per second while profiling')
+    args = parser.parse_args(argv)
+    if not args.profile_rate > 0:
+        parser.error('--profile-rate must be greater than 0')
+
+    profiler = Sampling_Profiler(args.profile, interval=1 / args.profile_rate) if args.profile else None
+    curses.wrapper(start, profiler)
@@ -0,0 +1,151 @@
+import json
+import math
+import threading
+import time
+
+from atomicFile import atomic_write
+
+
+class Histogram(object):
+
+    def __init__(self, smallest=1e-6, largest=100, bucketsPerDoubling=8):
+        """ Counts of durations in buckets growing geometrically, so percentiles are
+            accurate to a few percent whatever the number of samples
+            Args:
+                smallest (float) = The upper bound in seconds of the first bucket
+                largest (float) = Seconds above which durations share the last bucket
+                bucketsPerDoubling (int) = The number of buckets between a duration and twice it
+        """
+        self.smallest = smallest
+        self.scale = bucketsPerDoubling / math.log(2)
+        self.counts = [0] * (int(math.log(largest / smallest) * self.scale) + 2)
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """ Add a duration
+            Args:
+                seconds (float) = The duration
+        """
+        index = min(int(math.log(seconds / self.smallest) * self.scale) + 1, len(self.counts) - 1) if seconds > self.smallest else 0
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, fraction):
+        """ Return the upper bound of the bucket holding the duration at fraction of the way through the samples
+            Args:
+                fraction (float) = 0.5 for the median, 0.99 for the 99th percentile
+        """
+        with self.lock:
+            rank = max(1, math.ceil(fraction * self.count))
+            seen = 0
+            for (index, count) in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(self.smallest * math.exp(index / self.scale), self.max)
+        return 0.0
+
+    def summary(self):
+        """ Return count, mean, p50, p90, p99 and max in seconds """
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+
+class Timer(object):
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        """ A context manager recording the time spent in its block to histogram """
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics(object):
+
+    def __init__(self):
+        """ Latency histograms by name, shared by the whole program. Recording is a clock
+            read and a bucket increment, so it is always on.
+        """
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def histogram(self, name):
+        """ Return the histogram named name, creating it on first use
+            Args:
+                name (str) = The histogram name
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def record(self, name, seconds):
+        """ Add a duration to the histogram named name
+            Args:
+                name (str) = The histogram name
+                seconds (float) = The duration
+        """
+        self.histogram(name).record(seconds)
+
+    def timer(self, name):
+        """ Return a context manager recording the time spent in its block under name
+            Args:
+                name (str) = The histogram name
+        """
+        return Timer(self.histogram(name))
+
+    def percentiles(self, name, fractions=(0.5, 0.99)):
+        """ Return the percentiles of the histogram named name, or None if nothing was recorded
+            Args:
+                name (str) = The histogram name
+                fractions (tuple) = The percentiles to return
+        """
+        histogram = self.histograms.get(name)
+        if not histogram or not histogram.count:
+            return None
+        return [histogram.percentile(fraction) for fraction in fractions]
+
+    def summary(self):
+        """ Return histogram name -> count, mean, percentiles and max """
+        with self.lock:
+            histograms = list(self.histograms.items())
+        return {name: histogram.summary() for (name, histogram) in sorted(histograms)}
+
+    def save(self, path, counters=None):
+        """ Write the histogram summaries to a JSON file
+            Args:
+                path (str) = The file to write
+                counters (obj) = Other stats to save alongside, such as cache hit rates
+        """
+        atomic_write(path, json.dumps({
+            'started': self.started,
+            'seconds': time.time() - self.started,
+            'timings': self.summary(),
+            'counters': counters or {},
+        }, indent=2, sort_keys=True))
+
+
+# The metrics every module records to
+METRICS = Metrics()
@@ -1,52 +1,341 @@
+import json
+import os
+import random
+
+from atomicFile import atomic_write
+from records import record_from_dict
+
+def track_fields(track):
+    """ Return the journal fields of a track record, or of a track given as a plain dict """
+
+    return track.to_dict() if hasattr(track, 'to_dict') else dict(track)
+
+class Queue_Node:
+
+    __slots__ = ('track', 'prev', 'next', 'slot')
+
+    def __init__(self, track=None, slot=None):
+        """ A track's place in the queue's linked list """
+
+        self.track = track
+        self.prev = self.next = self
+        self.slot = slot
+
 class PlayQueue:
 
-    def __init__(self):
-        """ Set up an internal queue for creating user playlists """
+    def __init__(self, journalPath=None, compactRatio=2):
+        """ Set up an internal queue for creating user playlists
+
+            Tracks are kept in a doubly linked list for constant-time insertion and
+            removal around the cursor, with a uri index for dedupe and membership and a
+            slot array for the lazy shuffle. Changes are appended to an optional journal
+            file which is replayed on startup.
+
+            Args:
+                journalPath (str) = Optional file to persist the queue to
+                compactRatio (int) = Rewrite the journal once it holds this many lines per queued track
+        """
+
+        self.journalPath = journalPath
+        self.compactRatio = compactRatio
+        self.journal = None
+        self.journalLines = 0
+
+        self.reset()
+        if self.journalPath:
+            self.load_journal()
+
+    def reset(self):
+        """ Empty the queue without journaling """
+
+        # Sentinel node: head.next is the first track and head.prev the last
+        self.head = Queue_Node()
+        self.cursor = self.head
+        self.index = {}
+        self.slots = []
+        self.removedSlots = 0
+        # The queued tracks as a list, built when first asked for after a change
+        self.ordered = None
+        self.reset_shuffle()
+        self.shuffle = getattr(self, 'shuffle', False)
+
+    def reset_shuffle(self):
+        """ Start a new shuffle order from the current track """
+
+        # Lazy Fisher-Yates over self.slots: only swapped positions are stored
+        self.shuffleSwaps = {}
+        self.shuffleDrawn = 0
+        self.shuffleHistory = [self.cursor] if self.cursor is not self.head else []
+        self.shuffleStart = self.cursor
+        self.shufflePosition = len(self.shuffleHistory) - 1
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, track_uri):
+        return track_uri in self.index
+
+    def __iter__(self):
+        node = self.head.next
+        while node is not self.head:
+            yield node.track
+            node = node.next
+
+    @property
+    def playQueue(self):
+        """ Return the queued tracks in order. The list is shared until the queue changes, so do not modify it """
+
+        if self.ordered is None:
+            self.ordered = list(self)
+        return self.ordered
+
+    def link(self, track, after):
+        """ Insert track after node and return its node, or None if already queued """
+
+        if track['track_uri'] in self.index:
+            return None
+        node = Queue_Node(track, len(self.slots))
+        node.prev = after
+        node.next = after.next
+        after.next.prev = node
+        after.next = node
+        self.index[track['track_uri']] = node
+        self.slots.append(node)
+        self.ordered = None
+        return node
+
+    def unlink(self, node):
+        """ Remove node from queue """
+
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        del self.index[node.track['track_uri']]
+        self.ordered = None
+        self.slots[node.slot] = None
+        node.slot = None
+        self.removedSlots += 1
+        if self.cursor is node:
+            self.cursor = node.prev
+        if self.removedSlots > 1024 and self.removedSlots * 2 > len(self.slots):
+            self.compact_slots()
+
+    def compact_slots(self):
+        """ Drop removed entries from the slot array """
 
-        self.playQueue = []
-        self.currentPlayQueueIndex = -1
+        self.slots = [node for node in self.slots if node is not None]
+        for (slot, node) in enumerate(self.slots):
+            node.slot = slot
+        self.removedSlots = 0
+        self.reset_shuffle()
 
     def add_track(self, track):
-        """ Add track to queue """
+        """ Add track to queue, return whether it was added """
 
-        self.playQueue.append(track)
+        if self.link(track, self.head.prev):
+            self.write_journal([{'op': 'add', 'track': track_fields(track)}])
+            return True
+        return False
 
     def add_tracks(self, tracks):
-        """ Add array of tracks to queue """
+        """ Add array of tracks to queue, return the number added """
 
-        self.playQueue += tracks
+        added = [track for track in tracks if self.link(track, self.head.prev)]
+        self.write_journal([{'op': 'add', 'track': track_fields(track)} for track in added])
+        return len(added)
+
+    def insert_next_track(self, track):
+        """ Add track to queue right after the current track, return whether it was added """
+
+        if self.link(track, self.cursor):
+            after = self.cursor.track['track_uri'] if self.cursor is not self.head else None
+            self.write_journal([{'op': 'insert', 'after': after, 'track': track_fields(track)}])
+            return True
+        return False
+
+    def remove_track(self, track_uri):
+        """ Remove track from queue, return whether it was queued """
+
+        node = self.index.get(track_uri)
+        if not node:
+            return False
+        self.unlink(node)
+        self.write_journal([{'op': 'remove', 'uri': track_uri}])
+        return True
 
     def clear_playQueue(self):
         """ Remove all tracks from queue """
 
-        self.playQueue = []
-        self.currentPlayQueueIndex = -1
+        self.reset()
+        self.write_journal([{'op': 'clear'}])
+
+    def toggle_shuffle(self):
+        """ Toggle shuffled play order, return whether shuffle is on """
+
+        self.shuffle = not self.shuffle
+        self.reset_shuffle()
+        return self.shuffle
+
+    def draw_shuffled(self):
+        """ Return a random track node not yet played in this shuffle, or None """
+
+        while self.shuffleDrawn < len(self.slots):
+            i = self.shuffleDrawn
+            j = random.randrange(i, len(self.slots))
+            drawn = self.shuffleSwaps.get(j, j)
+            replaced = self.shuffleSwaps.pop(i, i)
+            if j != i:
+                self.shuffleSwaps[j] = replaced
+            self.shuffleDrawn += 1
+            node = self.slots[drawn]
+            if node is not None and node is not self.shuffleStart:
+                return node
+        return None
+
+    def shuffle_ahead(self):
+        """ Return the shuffle history position of the next queued track, drawing one if none
+            was played before, or None. The cursor does not move.
+        """
+
+        for position in range(self.shufflePosition + 1, len(self.shuffleHistory)):
+            if self.shuffleHistory[position].slot is not None:
+                return position
+        node = self.draw_shuffled()
+        if node is None:
+            return None
+        self.shuffleHistory.append(node)
+        return len(self.shuffleHistory) - 1
+
+    def shuffle_behind(self):
+        """ Return the shuffle history position of the previous queued track, or None """
+
+        for position in range(self.shufflePosition - 1, -1, -1):
+            if self.shuffleHistory[position].slot is not None:
+                return position
+        return None
 
     def has_next_track(self):
         """ Return whether queue has a next track """
 
-        return self.currentPlayQueueIndex < (len(self.playQueue) - 1)
+        if self.shuffle:
+            return self.shuffle_ahead() is not None
+        return self.cursor.next is not self.head
 
     def has_previous_track(self):
         """ Return whether queue has a previous track """
 
-        return self.currentPlayQueueIndex > 0 and self.currentPlayQueueIndex <= len(self.playQueue)
+        if self.shuffle:
+            return self.shuffle_behind() is not None
+        return self.cursor is not self.head and self.cursor.prev is not self.head
 
     def next_track(self):
         """ Return next track in queue if next track exists """
 
-        if self.has_next_track():
-            self.currentPlayQueueIndex += 1
-            return self.playQueue[self.currentPlayQueueIndex]
-        else:
-            return None
+        node = None
+        if self.shuffle:
+            position = self.shuffle_ahead()
+            if position is not None:
+                self.shufflePosition = position
+                node = self.shuffleHistory[position]
+        elif self.cursor.next is not self.head:
+            node = self.cursor.next
+        return self.move_cursor(node)
 
     def prev_track(self):
         """ Return previous track in queue if previous track exists """
 
-        if self.has_previous_track():
-            self.currentPlayQueueIndex -= 1
-            return self.playQueue[self.currentPlayQueueIndex]
-        else:
+        node = None
+        if self.shuffle:
+            position = self.shuffle_behind()
+            if position is not None:
+                self.shufflePosition = position
+                node = self.shuffleHistory[position]
+        elif self.has_previous_track():
+            node = self.cursor.prev
+        return self.move_cursor(node)
+
+    def move_cursor(self, node):
+        """ Make node the current track and return its track, or None """
+
+        if node is None:
             return None
+        self.cursor = node
+        self.write_journal([{'op': 'cursor', 'uri': node.track['track_uri']}])
+        return node.track
+
+    def write_journal(self, entries):
+        """ Append queue changes to the journal """
+
+        if not self.journalPath or not entries:
+            return
+        if not self.journal:
+            directory = os.path.dirname(self.journalPath)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.journal = open(self.journalPath, 'a')
+        self.journal.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+        self.journal.flush()
+        self.journalLines += len(entries)
+        # Cursor moves add a line each, so a long session compacts as it goes
+        if self.journal_oversized():
+            self.compact_journal()
+
+    def journal_oversized(self):
+        """ Return whether the journal has grown much larger than the queue it holds """
+
+        return self.journalLines > self.compactRatio * len(self) + 100
+
+    def load_journal(self):
+        """ Replay the journal, then rewrite it if it has grown much larger than the queue """
+
+        try:
+            with open(self.journalPath) as journal:
+                for line in journal:
+                    try:
+                        self.replay(json.loads(line))
+                    except (ValueError, KeyError):
+                        # A partly written last line
+                        continue
+                    self.journalLines += 1
+        except IOError:
+            return
+        if self.journal_oversized():
+            self.compact_journal()
+
+    def replay(self, entry):
+        """ Apply one journal entry without journaling it again """
+
+        op = entry['op']
+        if op == 'add':
+            self.link(record_from_dict(entry['track']), self.head.prev)
+        elif op == 'insert':
+            after = self.index.get(entry['after']) if entry['after'] else self.head
+            self.link(record_from_dict(entry['track']), after or self.head.prev)
+        elif op == 'remove':
+            node = self.index.get(entry['uri'])
+            if node:
+                self.unlink(node)
+        elif op == 'cursor':
+            self.cursor = self.index.get(entry['uri'], self.head)
+        elif op == 'clear':
+            self.reset()
+
+    def compact_journal(self):
+        """ Rewrite the journal as one entry per queued track plus the cursor """
+
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+        entries = [{'op': 'add', 'track': track_fields(track)} for track in self]
+        if self.cursor is not self.head:
+            entries.append({'op': 'cursor', 'uri': self.cursor.track['track_uri']})
+        atomic_write(self.journalPath, ''.join(json.dumps(entry) + '\n' for entry in entries))
+        self.journalLines = len(entries)
+
+    def close(self):
+        """ Compact and close the journal """
 
+        if self.journalPath and self.journal_oversized():
+            self.compact_journal()
+        if self.journal:
+            self.journal.close()
+            self.journal = None
@@ -0,0 +1,250 @@
+import json
+import subprocess
+import threading
+import time
+
+from collections import deque
+from metrics import METRICS
+
+# JavaScript for Automation loop run by one long-lived osascript process. It reads
+# one JSON command per line from stdin and writes one JSON reply per line to stdout.
+JXA_SERVER = '''
+ObjC.import('Foundation');
+var spotify = Application('Spotify');
+var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+var buffer = '';
+
+function reply(obj) {
+    stdout.writeData($(JSON.stringify(obj) + '\\n').dataUsingEncoding($.NSUTF8StringEncoding));
+}
+
+function handle(cmd) {
+    if (cmd.op === 'play_track') { spotify.playTrack(cmd.uri); return null; }
+    if (cmd.op === 'play_pause') { spotify.playpause(); return null; }
+    if (cmd.op === 'get_status') {
+        var status = { state: spotify.playerState(), position: spotify.playerPosition(), track_id: null, duration_ms: null };
+        try {
+            status.track_id = spotify.currentTrack.id();
+            status.duration_ms = spotify.currentTrack.duration();
+        } catch (e) {}
+        return status;
+    }
+    throw new Error('unknown command ' + cmd.op);
+}
+
+while (true) {
+    var data = stdin.availableData;
+    if (data.length === 0) { break; }
+    buffer += $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+    var newline;
+    while ((newline = buffer.indexOf('\\n')) >= 0) {
+        var line = buffer.slice(0, newline);
+        buffer = buffer.slice(newline + 1);
+        try { reply({ ok: true, result: handle(JSON.parse(line)) }); }
+        catch (e) { reply({ ok: false, error: String(e) }); }
+    }
+}
+'''
+
+class Player_Backend(object):
+
+    def __init__(self, latencySamples=200):
+        """ Interface to a music player
+            Args:
+                latencySamples (int) = The number of recent latencies to keep per command
+        """
+        self.latencySamples = latencySamples
+        self.latencies = {}
+
+    def timed(self, name, method, *args, **kwargs):
+        """ Return result of method and record its latency
+            Args:
+                name (str) = The command name to record latency under
+                method (func) = The method to execute
+        """
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            latency = time.perf_counter() - start
+            if name not in self.latencies:
+                self.latencies[name] = deque(maxlen=self.latencySamples)
+            self.latencies[name].append(latency)
+            METRICS.record('player.' + name, latency)
+
+    def latency_stats(self):
+        """ Return count, mean and max latency in seconds for each command """
+        stats = {}
+        for (name, samples) in list(self.latencies.items()):
+            samples = list(samples)
+            if samples:
+                stats[name] = {
+                    'count': len(samples),
+                    'mean': sum(samples) / len(samples),
+                    'max': max(samples),
+                }
+        return stats
+
+    def play_track(self, track_uri):
+        """ Play track
+            Args:
+                track_uri (str) = The Spotify API track uri for the track to be played
+        """
+        raise NotImplementedError
+
+    def play_pause(self):
+        """ Toggle play/pause """
+        raise NotImplementedError
+
+    def get_status(self):
+        """ Return player state, position in seconds, current track id and its duration_ms """
+        raise NotImplementedError
+
+    def close(self):
+        """ Release backend resources """
+        pass
+
+
+class AppleScript_Backend(Player_Backend):
+
+    def __init__(self, *args, **kwargs):
+        """ Control the Spotify desktop app through one long-lived osascript process """
+        Player_Backend.__init__(self, *args, **kwargs)
+        self.process = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """ Start the osascript command loop. Caller must hold lock """
+        self.process = subprocess.Popen(['osascript', '-l', 'JavaScript', '-e', JXA_SERVER],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def stop(self):
+        """ Stop the osascript command loop. Caller must hold lock """
+        if self.process:
+            try:
+                self.process.stdin.close()
+                self.process.wait(1)
+            except Exception:
+                self.process.kill()
+            self.process = None
+
+    def send_command(self, op, **args):
+        """ Send command to the osascript loop and return its result, restarting the loop once if it died
+            Args:
+                op (str) = The command name
+        """
+        with self.lock:
+            for attempt in range(2):
+                if not self.process or self.process.poll() is not None:
+                    self.start()
+                try:
+                    self.process.stdin.write((json.dumps(dict(args, op=op)) + '\n').encode('utf-8'))
+                    self.process.stdin.flush()
+                    line = self.process.stdout.readline()
+                    if not line:
+                        raise IOError('osascript exited')
+                    reply = json.loads(line.decode('utf-8'))
+                    break
+                except (IOError, ValueError):
+                    self.stop()
+                    if attempt:
+                        raise
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    def play_track(self, track_uri):
+        """ Play track
+            Args:
+                track_uri (str) = The Spotify API track uri for the track to be played
+        """
+        self.timed('play_track', self.send_command, 'play_track', uri=track_uri)
+
+    def play_pause(self):
+        """ Toggle play/pause """
+        self.timed('play_pause', self.send_command, 'play_pause')
+
+    def get_status(self):
+        """ Return player state, position in seconds, current track id and its duration_ms """
+        return self.timed('get_status', self.send_command, 'get_status')
+
+    def close(self):
+        """ Stop the osascript process """
+        with self.lock:
+            self.stop()
+
+
+class Fake_Backend(Player_Backend):
+
+    def __init__(self, durations=None, defaultDuration=180000, clock=time.monotonic, **kwargs):
+        """ A scriptable in-process player for testing without Spotify
+            Args:
+                durations (obj) = Track uri -> duration_ms
+                defaultDuration (int) = The duration_ms of tracks not in durations
+                clock (func) = Returns the current time in seconds
+        """
+        Player_Backend.__init__(self, **kwargs)
+        self.durations = durations or {}
+        self.defaultDuration = defaultDuration
+        self.clock = clock
+        self.commands = []
+        self.lock = threading.Lock()
+
+        self.state = 'stopped'
+        self.trackId = None
+        self.offset = 0.0
+        self.startedAt = None
+
+    def position(self):
+        """ Return position in seconds of the current track. Caller must hold lock """
+        if self.state == 'playing':
+            return self.offset + self.clock() - self.startedAt
+        return self.offset
+
+    def update(self):
+        """ Stop at the end of the current track like the Spotify app does. Caller must hold lock """
+        if self.state == 'playing' and self.position() * 1000 >= self.durations.get(self.trackId, self.defaultDuration):
+            self.state = 'paused'
+            self.offset = 0.0
+
+    def sent_commands(self):
+        """ Return a copy of the commands received so far """
+        with self.lock:
+            return list(self.commands)
+
+    def play_track(self, track_uri):
+        """ Play track
+            Args:
+                track_uri (str) = The Spotify API track uri for the track to be played
+        """
+        with self.lock:
+            self.timed('play_track', self.commands.append, ('play_track', track_uri))
+            self.trackId = track_uri
+            self.state = 'playing'
+            self.offset = 0.0
+            self.startedAt = self.clock()
+
+    def play_pause(self):
+        """ Toggle play/pause """
+        with self.lock:
+            self.timed('play_pause', self.commands.append, ('play_pause',))
+            self.update()
+            if self.state == 'playing':
+                self.offset = self.position()
+                self.state = 'paused'
+            elif self.trackId:
+                self.state = 'playing'
+                self.startedAt = self.clock()
+
+    def get_status(self):
+        """ Return player state, position in seconds, current track id and its duration_ms """
+        with self.lock:
+            self.timed('get_status', self.commands.append, ('get_status',))
+            self.update()
+            return {
+                'state': self.state,
+                'position': self.position(),
+                'track_id': self.trackId,
+                'duration_ms': self.durations.get(self.trackId, self.defaultDuration) if self.trackId else None,
+            }
@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+
+from atomicFile import atomic_write
+from collections import Counter
+
+
+class Sampling_Profiler(object):
+
+    def __init__(self, path, interval=0.01):
+        """ Samples the stack of every thread at a fixed interval and writes them as collapsed
+            stacks, one 'thread;outer;...;inner count' line per distinct stack, which flame graph
+            tools read. Samples are of wall time, so threads waiting on input or the network show
+            where they wait.
+            Args:
+                path (str) = The file to write collapsed stacks to
+                interval (float) = Seconds between samples
+        """
+        self.path = path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread = None
+        self.stopping = threading.Event()
+
+        # Code object -> frame label, as formatting a label costs more than taking the sample
+        self.labels = {}
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def start(self):
+        """ Start sampling in a background thread """
+        if self.thread:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.sample_forever, name='profiler')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """ Stop sampling, keeping the samples taken so far """
+        if not self.thread:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+
+    def sample_forever(self):
+        """ Take samples until stopped """
+        ownId = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            self.sample(ignore=ownId)
+
+    def sample(self, ignore=None):
+        """ Record the current stack of every thread
+            Args:
+                ignore (int) = The ident of a thread not to sample
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for (ident, frame) in sys._current_frames().items():
+            if ident == ignore:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self.label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, 'thread-{0}'.format(ident)))
+            stacks.append(';'.join(reversed(stack)))
+        with self.lock:
+            self.stacks.update(stacks)
+            self.samples += 1
+
+    def label(self, code):
+        """ Return the frame label of a code object, as function (file:line)
+            Args:
+                code (obj) = The code object of a frame
+        """
+        label = self.labels.get(code)
+        if label is None:
+            label = self.labels[code] = '{0} ({1}:{2})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+        return label
+
+    def write(self):
+        """ Write the collapsed stacks sampled so far to the profile file """
+        with self.lock:
+            stacks = sorted(self.stacks.items())
+        atomic_write(self.path, ['{0} {1}\n'.format(stack, count) for (stack, count) in stacks])
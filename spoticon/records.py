@@ -0,0 +1,142 @@
+import sys
+
+
+class Record(object):
+
+    __slots__ = ()
+    category = None
+
+    def __init_subclass__(cls, **kwargs):
+        """ Collect the field names of each record type """
+        super().__init_subclass__(**kwargs)
+        cls.fields = tuple(name for klass in reversed(cls.__mro__) for name in klass.__dict__.get('__slots__', ()))
+        cls.fieldSet = frozenset(cls.fields + ('category',))
+
+    def __init__(self, **fields):
+        """ A compact result line with mapping-style access to its fields. Fields that
+            are not given are absent, as a missing dict key would be.
+        """
+        for (name, value) in fields.items():
+            setattr(self, name, value)
+
+    def __getitem__(self, key):
+        if key in self.fieldSet:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.fieldSet:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.fieldSet and hasattr(self, key)
+
+    def get(self, key, default=None):
+        """ Return value of field or default if absent
+            Args:
+                key (str) = The field name
+                default (obj) = The value to return if the field is absent
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """ Return the names of the fields that are present """
+        return [name for name in self.fields if hasattr(self, name)] + ['category']
+
+    def to_dict(self):
+        """ Return the record as a plain dict """
+        return {name: self[name] for name in self.keys()}
+
+    @classmethod
+    def from_dict(cls, fields):
+        """ Return a record of this type from a dict made by to_dict
+            Args:
+                fields (obj) = Field name -> value
+        """
+        return cls(**{name: value for (name, value) in fields.items() if name != 'category'})
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, ', '.join('{0}={1!r}'.format(name, self[name]) for name in self.keys() if name != 'category'))
+
+
+def intern(value):
+    """ Return an interned copy of a string so repeated ids and names share memory
+        Args:
+            value (str) = The string to intern
+    """
+    return sys.intern(value) if value.__class__ is str else value
+
+
+class Track(Record):
+    __slots__ = ('track_name', 'track_number', 'album_name', 'album_id', 'artist_name', 'artist_id', 'track_uri', 'duration_ms', 'popularity')
+    category = 'track'
+
+    def __init__(self, track_name=None, track_number=None, album_name=None, album_id=None, artist_name=None, artist_id=None, track_uri=None, duration_ms=None, **fields):
+        """ A track. Tracks are by far the most numerous records, so the common
+            fields are assigned directly. Album and artist fields repeat across
+            tracks and are interned; track names and uris are unique and are not.
+        """
+        self.track_name = track_name
+        self.track_number = track_number
+        self.album_name = intern(album_name)
+        self.album_id = intern(album_id)
+        self.artist_name = intern(artist_name)
+        self.artist_id = intern(artist_id)
+        self.track_uri = track_uri
+        self.duration_ms = duration_ms
+        for (name, value) in fields.items():
+            setattr(self, name, value)
+
+
+class Album(Record):
+    __slots__ = ('album_id', 'album_name', 'album_uri', 'album_art_uri', 'album_art')
+    category = 'album'
+
+
+class Artist(Record):
+    __slots__ = ('artist_id', 'artist_name', 'artist_uri', 'popularity')
+    category = 'artist'
+
+
+class Playlist(Record):
+    __slots__ = ('playlist_name', 'playlist_id', 'owner_id')
+    category = 'playlist'
+
+
+class Title_Bar(Record):
+    __slots__ = ('title',)
+    category = 'title_bar'
+
+
+class Album_Art_Line(Record):
+    __slots__ = ('line',)
+    category = 'album_art'
+
+
+class Album_Row(Record):
+    __slots__ = ()
+    category = 'album'
+
+
+RECORD_TYPES = {recordType.category: recordType for recordType in (Track, Artist, Playlist)}
+RECORD_TYPES['album'] = Album
+
+# Layout rows are the same for every result set, so they are shared
+TITLE_BARS = {title: Title_Bar(title=title) for title in ('PLAYLISTS', 'ARTISTS', 'ALBUMS', 'TRACKS')}
+ALBUM_ART_LINES = tuple(Album_Art_Line(line=x) for x in range(35))
+ALBUM_ROW = Album_Row()
+
+
+def record_from_dict(fields):
+    """ Return the record type named by a dict's category built from the dict
+        Args:
+            fields (obj) = A dict made by Record.to_dict
+    """
+    return RECORD_TYPES[fields['category']].from_dict(fields)
@@ -0,0 +1,153 @@
+import heapq
+import itertools
+import threading
+import time
+
+# Request priorities, lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class Request_Scheduler(object):
+
+    def __init__(self, rate=20, burst=100, maxConcurrency=8, minConcurrency=1, maxRetries=8, defaultRetryAfter=1, backoff=0.75, clock=time.monotonic):
+        """ A gate every Web API request passes through. Requests start from a token bucket,
+            interactive requests ahead of background ones. The bucket's rate and the number of
+            requests in flight creep up while requests succeed and are cut when Spotify rate
+            limits, and a Retry-After from any request pauses all of them.
+            Args:
+                rate (float) = The max average number of requests started per second
+                burst (int) = The max number of requests started at once after being idle. The
+                              default covers every page of a 10,000 track playlist
+                maxConcurrency (int) = The max number of requests in flight
+                minConcurrency (int) = The least the number of requests in flight is cut to
+                maxRetries (int) = The number of times a rate limited request is retried
+                defaultRetryAfter (float) = Seconds to pause when a rate limit has no Retry-After
+                backoff (float) = The fraction of the rate kept after a rate limit
+                clock (func) = Returns the current time in seconds
+        """
+        self.maxRate = rate
+        self.rate = rate
+        self.minRate = rate / 20
+        self.backoff = backoff
+        self.burst = burst
+        self.maxConcurrency = maxConcurrency
+        self.minConcurrency = minConcurrency
+        self.maxRetries = maxRetries
+        self.defaultRetryAfter = defaultRetryAfter
+        self.clock = clock
+
+        self.condition = threading.Condition()
+        self.tokens = burst
+        self.refilled = clock()
+        self.concurrency = maxConcurrency
+        self.active = 0
+        self.successes = 0
+        self.pausedUntil = 0
+
+        # (priority, ticket) of requests waiting to start
+        self.waiting = []
+        self.tickets = itertools.count()
+
+        self.started = 0
+        self.throttled = 0
+        self.failed = 0
+
+    def call(self, priority, task):
+        """ Return the result of task once the scheduler lets it run, retrying it while rate limited
+            Args:
+                priority (int) = INTERACTIVE or BACKGROUND
+                task (func) = Makes the request and returns its result
+        """
+        for attempt in range(self.maxRetries + 1):
+            self.acquire(priority)
+            try:
+                result = task()
+            except Exception as error:
+                retryAfter = self.retry_after(error)
+                self.release(retryAfter, failed=retryAfter is None)
+                if retryAfter is None or attempt == self.maxRetries:
+                    raise
+                continue
+            self.release()
+            return result
+
+    def retry_after(self, error):
+        """ Return seconds to wait before retrying a failed request, or None if it should not be retried
+            Args:
+                error (Exception) = The exception the request raised
+        """
+        if getattr(error, 'http_status', None) != 429:
+            return None
+        headers = getattr(error, 'headers', None) or {}
+        try:
+            return float(headers.get('Retry-After', self.defaultRetryAfter))
+        except (TypeError, ValueError):
+            return self.defaultRetryAfter
+
+    def refill(self, now):
+        """ Add the tokens earned since the last refill. Caller must hold condition """
+        if now <= self.refilled:
+            return
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+    def acquire(self, priority):
+        """ Block until a request of priority may start
+            Args:
+                priority (int) = INTERACTIVE or BACKGROUND
+        """
+        ticket = (priority, next(self.tickets))
+        with self.condition:
+            heapq.heappush(self.waiting, ticket)
+            while True:
+                now = self.clock()
+                self.refill(now)
+                if self.waiting[0] == ticket and self.active < self.concurrency and now >= self.pausedUntil and self.tokens >= 1:
+                    break
+                if self.waiting[0] != ticket or self.active >= self.concurrency:
+                    # Woken when the head of the queue starts or a request finishes
+                    self.condition.wait()
+                else:
+                    self.condition.wait(max(self.pausedUntil - now, (1 - self.tokens) / self.rate, 0.001))
+            heapq.heappop(self.waiting)
+            self.tokens -= 1
+            self.active += 1
+            self.started += 1
+            self.condition.notify_all()
+
+    def release(self, retryAfter=None, failed=False):
+        """ Record that a request finished
+            Args:
+                retryAfter (float) = Seconds to pause all requests if it was rate limited
+                failed (bool) = Whether it failed for another reason, such as a timeout or server error
+        """
+        with self.condition:
+            self.active -= 1
+            if failed:
+                # Not evidence the limits can grow, nor that Spotify wants fewer requests
+                self.successes = 0
+                self.failed += 1
+            elif retryAfter is None:
+                self.successes += 1
+                self.rate = min(self.maxRate, self.rate + self.maxRate / 50)
+                if self.successes >= self.concurrency and self.concurrency < self.maxConcurrency:
+                    self.concurrency += 1
+                    self.successes = 0
+            else:
+                self.throttled += 1
+                self.successes = 0
+                now = self.clock()
+                # Requests already in flight when the pause began share one cut
+                if now >= self.pausedUntil:
+                    self.concurrency = max(self.minConcurrency, self.concurrency // 2)
+                    self.rate = max(self.minRate, self.rate * self.backoff)
+                self.pausedUntil = max(self.pausedUntil, now + retryAfter)
+                self.tokens = 0
+                self.refilled = max(now, self.pausedUntil)
+            self.condition.notify_all()
+
+    def stats(self):
+        """ Return requests started, rate limited and failed, and the current rate and concurrency limits """
+        with self.condition:
+            return {'started': self.started, 'throttled': self.throttled, 'failed': self.failed, 'rate': self.rate, 'concurrency': self.concurrency}
@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+
+from atomicFile import atomic_write
+from collections import OrderedDict
+
+# Seconds each kind of spotipy call stays fresh
+DEFAULT_TTLS = {
+    'search': 300,
+    'album': 86400,
+    'albums': 86400,
+    'artist': 86400,
+    'artist_albums': 86400,
+    'artist_top_tracks': 3600,
+    'user_playlists': 60,
+    'user_playlist': 300,
+    'user_playlist_tracks': 300,
+}
+
+class Response_Cache(object):
+
+    def __init__(self, path=None, ttls=None, defaultTtl=60, maxEntries=2000, maxBytes=64 * 1024 * 1024):
+        """ A TTL and LRU cache for Spotify Web API responses
+            Args:
+                path (str) = Optional file to persist the cache to between sessions
+                ttls (obj) = Seconds to keep responses for each spotipy method name
+                defaultTtl (int) = Seconds to keep responses for methods not in ttls
+                maxEntries (int) = The max number of cached responses
+                maxBytes (int) = The max total serialized size of cached responses
+        """
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.defaultTtl = defaultTtl
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if self.path:
+            self.load()
+
+    def make_key(self, name, args, kwargs):
+        """ Return cache key for a spotipy call
+            Args:
+                name (str) = The spotipy method name
+                args (tuple) = The positional arguments of the call
+                kwargs (obj) = The keyword arguments of the call
+        """
+        args = list(args)
+        if name == 'search' and args and isinstance(args[0], str):
+            # Spotify search is case and whitespace insensitive
+            args[0] = ' '.join(args[0].lower().split())
+        return name + ':' + json.dumps([args, kwargs], sort_keys=True, default=str)
+
+    def get(self, name, args, kwargs):
+        """ Return cached response for a spotipy call or None on miss
+            Args:
+                name (str) = The spotipy method name
+                args (tuple) = The positional arguments of the call
+                kwargs (obj) = The keyword arguments of the call
+        """
+        key = self.make_key(name, args, kwargs)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.time():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry:
+                self.remove(key)
+            self.misses += 1
+            return None
+
+    def contains(self, name, args, kwargs):
+        """ Return whether a fresh response for a spotipy call is cached, without counting a hit or miss
+            Args:
+                name (str) = The spotipy method name
+                args (tuple) = The positional arguments of the call
+                kwargs (obj) = The keyword arguments of the call
+        """
+        key = self.make_key(name, args, kwargs)
+        with self.lock:
+            entry = self.entries.get(key)
+            return bool(entry) and entry[0] > time.time()
+
+    def put(self, name, args, kwargs, value):
+        """ Store response for a spotipy call
+            Args:
+                name (str) = The spotipy method name
+                args (tuple) = The positional arguments of the call
+                kwargs (obj) = The keyword arguments of the call
+                value (obj) = The response to cache
+        """
+        ttl = self.ttls.get(name, self.defaultTtl)
+        if not ttl or value is None:
+            return
+        key = self.make_key(name, args, kwargs)
+        size = len(json.dumps(value))
+        if size > self.maxBytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (time.time() + ttl, size, value)
+            self.size += size
+            self.evict()
+
+    def remove(self, key):
+        """ Drop entry from cache. Caller must hold lock
+            Args:
+                key (str) = The cache key to drop
+        """
+        entry = self.entries.pop(key)
+        self.size -= entry[1]
+
+    def evict(self):
+        """ Drop least recently used entries until within bounds. Caller must hold lock """
+        while self.entries and (len(self.entries) > self.maxEntries or self.size > self.maxBytes):
+            self.remove(next(iter(self.entries)))
+
+    def clear(self):
+        """ Remove all cached responses """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def hit_rate(self):
+        """ Return the fraction of lookups served from cache """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """ Return cache counters """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'entries': len(self.entries),
+            'bytes': self.size,
+        }
+
+    def load(self):
+        """ Load unexpired responses from disk """
+        try:
+            with open(self.path) as cacheFile:
+                stored = json.load(cacheFile)
+        except (IOError, ValueError):
+            return
+        now = time.time()
+        with self.lock:
+            for (key, expires, value) in stored:
+                if expires > now:
+                    size = len(json.dumps(value))
+                    self.entries[key] = (expires, size, value)
+                    self.size += size
+            self.evict()
+
+    def save(self):
+        """ Write unexpired responses to disk in LRU order """
+        if not self.path:
+            return
+        now = time.time()
+        with self.lock:
+            stored = [[key, entry[0], entry[2]] for (key, entry) in self.entries.items() if entry[0] > now]
+        atomic_write(self.path, json.dumps(stored))
@@ -0,0 +1,53 @@
+import itertools
+import sys
+
+from collections.abc import Mapping
+
+
+class Result_Set(Mapping):
+
+    versions = itertools.count(1)
+
+    def __init__(self, results):
+        """ An immutable set of results with a version id and a cached screen layout
+            Args:
+                results (obj) = Result category name -> array of result lines
+        """
+        self.results = dict(results)
+        self.version = next(Result_Set.versions)
+
+        # Filled in by the window that lays the results out, then reused
+        self.layout = None
+
+    def estimate_size(self):
+        """ Return the approximate memory in bytes held by the result lines and their album art """
+        size = sys.getsizeof(self.results)
+        for lines in self.results.values():
+            size += sys.getsizeof(lines)
+            for line in lines:
+                size += sys.getsizeof(line)
+                albumArt = line.get('album_art')
+                if albumArt:
+                    size += sum(sys.getsizeof(artLine) for artLine in albumArt)
+        return size
+
+    def __getitem__(self, key):
+        return self.results[key]
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __eq__(self, other):
+        """ Result sets are equal only if they are the same version, which takes constant time """
+        if isinstance(other, Result_Set):
+            return self.version == other.version
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.version)
+
+    def __repr__(self):
+        return 'Result_Set(version={0}, {1})'.format(self.version, {key: len(value) for (key, value) in self.results.items()})
@@ -3,8 +3,16 @@ import io
 import math
 import time
 
+import numpy as np
 import urllib.request as urllib
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
+from metrics import METRICS
+from records import ALBUM_ART_LINES, ALBUM_ROW, TITLE_BARS
+from resultSet import Result_Set
+
+CHAR_SEQ = u'█▛▜▀▙▌▚▘▟▞▐▝▄▖▗ '
+CHAR_TABLE = np.array(list(CHAR_SEQ))
 
 
 class Window(object):
@@ -33,9 +41,25 @@ class Window(object):
         self.win.clear()
         self.win.border(1)
 
+    def resize(self, height, width, beginY, beginX):
+        """ Recreate the curses window with a new size and position
+            Args:
+                height (int) = The line height for this window
+                width (int) = The char width for this window
+                beginY (int) = The number of lines from main screen top to begin window
+                beginX (int) = The number of chars from main screen left to begin window
+        """
+        self.height = height
+        self.width = width
+        self.beginY = beginY
+        self.beginX = beginX
+        self.create_win()
+
 
 class Scroll_Window(Window):
 
+    BLANK_ROW = ('', curses.A_NORMAL)
+
     def __init__(self, *args, **kwargs):
         """ A scrolling curses window """
         Window.__init__(self, *args, **kwargs)
@@ -44,44 +68,101 @@ class Scroll_Window(Window):
         self.topLineNum = 0
         self.highlightLineNum = 0
 
+        # The (text, attr) currently drawn on each window row, None if unknown
+        self.screenRows = [None] * self.height
+
+    def render_line(self, line, highlighted):
+        """ Return the (text, attr) to draw for a line
+            Args:
+                line (obj) = The object to stringify
+                highlighted (bool) = Whether to highlight line
+        """
+        return self.BLANK_ROW
+
     def add_line(self, index, line, highlighted):
-        """ Draw a line in curses window
+        """ Draw a line in curses window if it differs from what is already drawn there
             Args:
                 index (int) = The window line to draw on
                 line (obj) = The object to stringify and draw
                 highlighted (bool) = Whether to highlight line
         """
-        pass
+        row = self.render_line(line, highlighted) if line is not None else self.BLANK_ROW
+        if self.screenRows[index] != row:
+            self.win.move(index, 0)
+            self.win.clrtoeol()
+            if row[0]:
+                self.win.addstr(index, 0, row[0], row[1])
+            self.screenRows[index] = row
+
+    def draw_rows(self, indices):
+        """ Draw the given window rows
+            Args:
+                indices (iter) = The window rows to draw
+        """
+        for index in indices:
+            linenum = self.topLineNum + index
+            line = self.orderedLines[linenum] if linenum < len(self.orderedLines) else None
+            self.add_line(index, line, index == self.highlightLineNum)
+
+    def scroll_rows(self, increment):
+        """ Shift the drawn rows by one with curses line delete/insert
+            Args:
+                increment (int) = 1 to move content up a row, -1 to move it down
+        """
+        self.win.move(0, 0)
+        if increment == 1:
+            self.win.deleteln()
+            self.screenRows = self.screenRows[1:] + [self.BLANK_ROW]
+        else:
+            self.win.insertln()
+            self.screenRows = [self.BLANK_ROW] + self.screenRows[:-1]
+
+    def invalidate(self):
+        """ Forget what is drawn so the next draw rewrites every row """
+        self.win.erase()
+        self.screenRows = [None] * self.height
+
+    def resize(self, *args, **kwargs):
+        """ Recreate the curses window with a new size and position, keeping the highlight on screen """
+        Window.resize(self, *args, **kwargs)
+        self.screenRows = [None] * self.height
+        if self.highlightLineNum >= self.height:
+            self.topLineNum += self.highlightLineNum - self.height + 1
+            self.highlightLineNum = self.height - 1
 
     def order_lines(self):
         """ Order lines for correct display order """
         self.orderedLines = self.lines
 
+    def is_new_lines(self, lines):
+        """ Return whether lines differ from the displayed lines. Result_Sets compare
+            by version, so this takes constant time.
+            Args:
+                lines (obj) = Lines to draw in window
+        """
+        return bool(lines) and lines != self.lines
+
     def get_highlighted_line(self):
         """ Return the object represented by the highlighted line """
         return self.orderedLines[self.topLineNum + self.highlightLineNum] if self.orderedLines else None
 
     def draw_screen(self, lines=None):
-        """ Draw the results on screen 
+        """ Draw the results on screen, rewriting only rows that changed
             Args:
                 lines (array) = Lines to draw in window
         """
-        if lines and lines != self.lines:
-            self.lines = lines
-            self.order_lines()
-            self.topLineNum = 0
-            self.highlightLineNum = 0
-
-        self.win.erase()
-        top = self.topLineNum
-        bottom = self.topLineNum + self.height
-
-        for (index,line,) in enumerate(self.orderedLines[top:bottom]):
-            linenum = self.topLineNum + index
-            highlighted = (index == self.highlightLineNum)
-            self.add_line(index, line, highlighted)
-
-        self.win.refresh()
+        with METRICS.timer('screen.draw'):
+            if self.is_new_lines(lines):
+                self.lines = lines
+                self.order_lines()
+                self.topLineNum = 0
+                self.highlightLineNum = 0
+                self.screenRows = [None] * self.height
+
+            if None in self.screenRows:
+                self.invalidate()
+            self.draw_rows(range(self.height))
+            self.win.refresh()
 
     def updown(self, increment):
         """ Move highlighted line up and down
@@ -89,15 +170,20 @@ class Scroll_Window(Window):
                 increment (int) = The number of lines to move the highlight bar
         """
         nextLineNum = self.highlightLineNum + increment
+        previousHighlight = self.highlightLineNum
 
         #Paging
         if increment == -1 and self.highlightLineNum == 0 and self.topLineNum != 0:
             self.topLineNum -= 1
-            self.draw_screen()
+            self.scroll_rows(-1)
+            self.draw_rows([0, 1])
+            self.win.refresh()
             return
         elif increment == 1 and nextLineNum == self.height and (self.topLineNum + self.height) != len(self.orderedLines):
             self.topLineNum += 1
-            self.draw_screen()
+            self.scroll_rows(1)
+            self.draw_rows([self.height - 2, self.height - 1])
+            self.win.refresh()
             return
 
         #Scroll highlight line
@@ -105,44 +191,148 @@ class Scroll_Window(Window):
             self.highlightLineNum = nextLineNum
         elif increment == 1 and (self.topLineNum + self.highlightLineNum + 1) != len(self.orderedLines) and self.highlightLineNum != len(self.orderedLines):
             self.highlightLineNum = nextLineNum
-        
-        self.draw_screen()
+
+        self.draw_rows([previousHighlight, self.highlightLineNum])
+        self.win.refresh()
 
 class Results_Window(Scroll_Window):
 
-    def __init__(self, *args, **kwargs):
-        """ The curses display window for results """
+    def __init__(self, *args, artCache=None, artWorkers=3, transport=None, **kwargs):
+        """ The curses display window for results
+            Args:
+                artCache (obj) = Optional Art_Cache for cover images and rendered album art
+                artWorkers (int) = The number of threads rendering album art in the background
+                transport (obj) = Optional Http_Transport to download cover images with
+        """
         Scroll_Window.__init__(self, *args, **kwargs)
 
+        self.artCache = artCache
+        self.transport = transport
         self.albumArtBegin = -1
         self.albumArtEnd = -1
         self.albumNumber = 0
 
-    def draw_screen(self, lines=None):
+        # Album index -> future rendering its art for the current result set
+        self.artPool = ThreadPoolExecutor(max_workers=artWorkers)
+        self.artFutures = {}
+        self.artPlaceholderShown = False
+
+        # id(line) -> (text, attr) of the line unhighlighted, for the current result set and width
+        self.rowCache = {}
+
+    def resize(self, *args, **kwargs):
+        """ Recreate the curses window and drop rows rendered for the old width """
+        Scroll_Window.resize(self, *args, **kwargs)
+        self.rowCache = {}
+
+    def draw_screen(self, lines=None, position=None):
         """ Draw the results on screen
             Args:
                 lines (array) = Loines to draw in window
+                position (tuple) = Optional scroll position from get_position to restore
         """
-        if lines and lines != self.lines:
+        newLines = self.is_new_lines(lines)
+        if newLines:
             self.albumArtBegin = -1
             self.albumArtEnd = -1
             self.albumNumber = 0
+            self.rowCache = {}
+            self.cancel_album_art()
+            if position:
+                self.lines = lines
+                self.order_lines()
+                self.set_position(position)
         Scroll_Window.draw_screen(self, lines=lines)
+        if newLines:
+            self.prefetch_album_art()
 
-    def add_line(self, index, line, highlighted):
-        """ Draw a line in curses window
+    def get_position(self):
+        """ Return the scroll position as (topLineNum, highlightLineNum, albumNumber) """
+        return (self.topLineNum, self.highlightLineNum, self.albumNumber)
+
+    def set_position(self, position):
+        """ Restore a scroll position from get_position, clamped to the current lines
             Args:
-                index (int) = The window line to draw on
-                line (obj) = The object to stringify and draw
+                position (tuple) = The (topLineNum, highlightLineNum, albumNumber) to restore
+        """
+        (top, highlight, albumNumber) = position
+        count = len(self.orderedLines)
+        self.topLineNum = max(0, min(top, count - 1))
+        self.highlightLineNum = max(0, min(highlight, self.height - 1, count - 1 - self.topLineNum))
+        albums = self.lines.get('albums') if self.lines else None
+        self.albumNumber = min(albumNumber, len(albums) - 1) if albums else 0
+        self.screenRows = [None] * self.height
+
+    def cancel_album_art(self):
+        """ Drop queued album art work for the current result set """
+        for future in self.artFutures.values():
+            future.cancel()
+        self.artFutures = {}
+        self.artPlaceholderShown = False
+
+    def prefetch_album_art(self):
+        """ Queue album art rendering for every album, nearest to the displayed album first.
+            Queued work that has not started is reordered around the displayed album.
+        """
+        albums = self.lines.get('albums') if self.lines else None
+        if not albums:
+            return
+        for index in sorted(range(len(albums)), key=lambda i: abs(i - self.albumNumber)):
+            future = self.artFutures.get(index)
+            if future and not future.cancel():
+                # Already running or done
+                continue
+            if 'album_art' not in albums[index] and albums[index]['album_art_uri']:
+                self.artFutures[index] = self.artPool.submit(self.asciinator, albums[index]['album_art_uri']['url'], 100)
+
+    def get_album_art(self, album):
+        """ Return album art lines for the displayed album or None while it is still rendering
+            Args:
+                album (obj) = The displayed album
+        """
+        if 'album_art' in album:
+            return album['album_art']
+        if not album['album_art_uri']:
+            album['album_art'] = []
+            return album['album_art']
+        future = self.artFutures.get(self.albumNumber)
+        if not future:
+            future = self.artFutures[self.albumNumber] = self.artPool.submit(self.asciinator, album['album_art_uri']['url'], 100)
+        if not future.done():
+            return None
+        try:
+            album['album_art'] = future.result()
+        except Exception:
+            album['album_art'] = []
+        return album['album_art']
+
+    def album_art_ready(self):
+        """ Return whether art drawn as a placeholder has finished rendering """
+        if not self.artPlaceholderShown:
+            return False
+        future = self.artFutures.get(self.albumNumber)
+        if future and not future.done():
+            return False
+        self.artPlaceholderShown = False
+        return True
+
+    def render_line(self, line, highlighted):
+        """ Return the (text, attr) to draw for a line, formatting each line only once
+            Args:
+                line (obj) = The object to stringify
                 highlighted (bool) = Whether to highlight line
         """
-        stringifiedLine = self.stringify_line(line)
-        if highlighted:
-            self.win.addstr(index, 0, stringifiedLine, curses.A_REVERSE)
-        elif line['category'] == 'title_bar':
-            self.win.addstr(index, 0, stringifiedLine, curses.A_BOLD)
-        else:
-            self.win.addstr(index, 0, stringifiedLine)
+        category = line['category']
+        # Rows are formatted to the window width, and album rows show whichever album the carousel is on
+        key = (id(line), self.width, self.albumNumber) if category in ('album', 'album_art') else (id(line), self.width)
+        row = self.rowCache.get(key)
+        if row is None:
+            stringifiedLine = self.stringify_line(line)
+            row = (stringifiedLine, curses.A_BOLD if category == 'title_bar' else curses.A_NORMAL)
+            if category != 'album_art' or 'album_art' in self.lines['albums'][self.albumNumber]:
+                # Art placeholders are replaced once the art is ready
+                self.rowCache[key] = row
+        return (row[0], curses.A_REVERSE) if highlighted else row
 
     def leftright(self, increment):
         """ Move highlighted line left and right. Used for album art """
@@ -150,86 +340,116 @@ class Results_Window(Scroll_Window):
             nextAlbumNumber = self.albumNumber + increment
             if nextAlbumNumber in range(len(self.lines['albums'])):
                 self.albumNumber = nextAlbumNumber
+                self.prefetch_album_art()
 
         self.draw_screen()
 
     def stringify_line(self, line):
-        """ Return string representation of line
+        """ Return string representation of line, filling the window width
             Args:
                 line (obj) = The object to be stringified
         """
+        # The last column is left empty, as curses cannot write the bottom right cell
+        width = self.width - 1
         if line['category'] == 'title_bar':
-            return '{0:<100}'.format(line.get('title'))
+            return '{0:<{1}}'.format(line.get('title')[:width], width)
         elif line['category'] == 'artist':
-            return '{0:<100}'.format(line.get('artist_name')[:50])
+            return '{0:<{1}}'.format(line.get('artist_name')[:50], width)
         elif line['category'] == 'track':
-            return '{0:<5} {1:<44} {2:^24} {3:>24}'.format(line.get('track_number'), line.get('track_name')[:30], line.get('album_name')[:20], line.get('artist_name')[:20])
+            # Track names get the width left over from the number, album and artist columns
+            nameWidth = max(width - 56, 30)
+            return '{0:<5} {1:<{4}} {2:^24} {3:>24}'.format(line.get('track_number'), line.get('track_name')[:nameWidth - 2], line.get('album_name')[:20], line.get('artist_name')[:20], nameWidth)[:width]
         elif line['category'] == 'playlist':
-            return '{0:<100}'.format(line.get('playlist_name'))
+            return '{0:<{1}}'.format(line.get('playlist_name')[:width], width)
         elif line['category'] == 'album':
-            return '{0:<100}'.format(self.lines['albums'][self.albumNumber]['album_name'][:100])
+            return '{0:<{1}}'.format(self.lines['albums'][self.albumNumber]['album_name'][:width], width)
         elif line['category'] == 'album_art':
-                album = self.lines['albums'][self.albumNumber]
-                if not 'album_art' in album:
-                    album['album_art'] = self.asciinator(album['album_art_uri']['url'], 100)
-                return '{0:<100}'.format(album['album_art'][line['line']][:100]) if len(album['album_art']) > line['line'] else '{0:<100}'.format('')
+                albumArt = self.get_album_art(self.lines['albums'][self.albumNumber])
+                if albumArt is None:
+                    self.artPlaceholderShown = True
+                    return '{0:^{1}}'.format('Loading album art...' if line['line'] == 17 else '', width)
+                return '{0:<{1}}'.format(albumArt[line['line']][:width] if len(albumArt) > line['line'] else '', width)
 
     def get_album(self):
         """ Return the active album that will be displayed """
         return self.lines['albums'][self.albumNumber] if 'albums' in self.lines and len(self.lines['albums']) > 0 else None
 
     def order_lines(self):
-        """ Order search results into array """
+        """ Order search results into array, reusing the layout cached on the result set """
+        layout = getattr(self.lines, 'layout', None)
+        if layout:
+            (self.orderedLines, self.albumArtBegin, self.albumArtEnd) = layout
+            return
+
         self.orderedLines= []
 
         if 'playlists' in self.lines and len(self.lines['playlists']):
-            self.orderedLines.append({
-                'title': 'PLAYLISTS',
-                'category': 'title_bar',
-            })
+            self.orderedLines.append(TITLE_BARS['PLAYLISTS'])
             self.orderedLines += self.lines['playlists']
 
         if 'artists' in self.lines and len(self.lines['artists']):
-            self.orderedLines.append({
-                'title': 'ARTISTS',
-                'category': 'title_bar',
-            })
+            self.orderedLines.append(TITLE_BARS['ARTISTS'])
             self.orderedLines += self.lines['artists']
 
         if 'albums' in self.lines and len(self.lines['albums']):
-            self.orderedLines.append({
-                'title': 'ALBUMS',
-                'category': 'title_bar',
-            })
+            self.orderedLines.append(TITLE_BARS['ALBUMS'])
             self.albumArtBegin = len(self.orderedLines) + 1
-            for x in range(35):
-                self.orderedLines.append({ 'line': x, 'category': 'album_art' })
+            self.orderedLines += ALBUM_ART_LINES
             self.albumArtEnd = len(self.orderedLines) 
-            self.orderedLines.append({ 'category': 'album' })
+            self.orderedLines.append(ALBUM_ROW)
         else:
             self.albumArtBegin = -1
             self.albumArtEnd = -1
 
         if 'tracks' in self.lines:
-            self.orderedLines.append({
-                'title': 'TRACKS',
-                'category': 'title_bar',
-            })
+            self.orderedLines.append(TITLE_BARS['TRACKS'])
             self.orderedLines += self.lines['tracks']
 
+        if isinstance(self.lines, Result_Set):
+            self.lines.layout = (self.orderedLines, self.albumArtBegin, self.albumArtEnd)
+
     # http://www.richard-h-clark.com/projects/block-art.html
     def asciinator(self, url, width):
-        """ Return unicode representation of an image 
+        """ Return unicode representation of an image, using the art cache when
+            the image has already been downloaded or rendered
             Args:
                 url (str) = A valid url for an image
                 width (int) = The char width for the unicode image
         """
-        CHAR_SEQ = u'█▛▜▀▙▌▚▘▟▞▐▝▄▖▗ '
+        with METRICS.timer('art.asciinator'):
+            if self.artCache:
+                lines = self.artCache.get_render(url, width, 'blocks')
+                if lines is not None:
+                    return lines
+                data = self.artCache.get_image(url)
+                if data is None:
+                    data = self.download(url)
+                    self.artCache.put_image(url, data)
+            else:
+                data = self.download(url)
+
+            lines = self.render_block_art(Image.open(io.BytesIO(data)), width)
+            if self.artCache:
+                self.artCache.put_render(url, width, 'blocks', lines)
+            return lines
+
+    def download(self, url):
+        """ Return the contents of url, over the shared pooled connections when there is a transport
+            Args:
+                url (str) = A valid url for an image
+        """
+        with METRICS.timer('art.download'):
+            if self.transport:
+                return self.transport.get(url)
+            return urllib.urlopen(url).read()
 
+    def render_block_art(self, orig_image, width):
+        """ Return unicode block art lines for a PIL image
+            Args:
+                orig_image (obj) = The PIL image to render
+                width (int) = The char width for the unicode image
+        """
         # Open the image and convert it to black and white
-        FILE_NAME = io.BytesIO(urllib.urlopen(url).read())
-        orig_image = Image.open(FILE_NAME)
-
         if orig_image.mode == 'RGBA':
             # Remove transparancy
             bg_image = Image.new("RGBA", 
@@ -252,27 +472,26 @@ class Results_Window(Scroll_Window):
         # multiples of two (two pixels per character).
         new_width = int(math.ceil(width / 2.0) * 2) * 2
         new_height = int(math.ceil(new_width / 6.0)) * 2
-        image = orig_image.resize((new_width, new_height), Image.ANTIALIAS)
+        image = orig_image.resize((new_width, new_height), Image.LANCZOS)
 
-        # Get the pixel data
-        pix = image.load()
+        # Get the pixel data as a [y, x] array. Converting a 1-bit image to 'L'
+        # gives the same 0/255 values that indexing the 1-bit image does.
+        pix = np.asarray(image.convert('L'), dtype=np.float64)
 
         # The value above which pixels are considered white and 
         # below which pixels are considered black.
         THRESHOLD = 255
 
-        lines = []
+        # Weight the four pixels of each 2x2 block with the same arithmetic as
+        # int(pix / THRESHOLD * n) to get the CHAR_SEQ index of every character.
+        char_index = ((pix[0::2, 0::2] / THRESHOLD * 8).astype(np.intp)
+                      + (pix[0::2, 1::2] / THRESHOLD * 4).astype(np.intp)
+                      + (pix[1::2, 0::2] / THRESHOLD * 2).astype(np.intp)
+                      + (pix[1::2, 1::2] / THRESHOLD).astype(np.intp))
 
-        # Itereate over all the pixels and generate the unicode 
-        # representation. Print it to stdout.
-        for y in range(0, new_height, 2):
-            s = ''
-            for x in range(0, new_width, 2):
-                char_index = int(pix[x, y] / THRESHOLD * 8) + int(pix[x+1, y] / THRESHOLD * 4) + int(pix[x, y+1] / THRESHOLD * 2) + int(pix[x+1, y+1] / THRESHOLD)
-                s += CHAR_SEQ[char_index]
-            lines.append(s)
-
-        return lines
+        # View each row of characters as a single string
+        chars = np.ascontiguousarray(CHAR_TABLE[char_index])
+        return chars.view('<U{0}'.format(chars.shape[1])).ravel().tolist()
 
 
 class Now_Playing_Window(Window):
@@ -280,6 +499,8 @@ class Now_Playing_Window(Window):
     def __init__(self, *args, **kwargs):
         """ The curses display window for the current track """
         self.currentTrack = None
+        # Lines of the performance overlay, None when it is hidden
+        self.overlay = None
         Window.__init__(self, *args, **kwargs)
 
     def draw_screen(self, track=None, repeat=False):
@@ -292,6 +513,37 @@ class Now_Playing_Window(Window):
             self.win.clear()
             self.win.addstr(1, 5, self.format_now_playing(track))
             self.win.border(1)
+            if self.overlay:
+                self.draw_overlay()
+        self.win.refresh()
+
+    def set_overlay(self, lines):
+        """ Show lines below the current track, or hide the overlay
+            Args:
+                lines (array) = Up to two lines of text, or None to hide the overlay
+        """
+        hidden = self.overlay and not lines
+        self.overlay = lines
+        if lines or hidden:
+            self.draw_overlay()
+            self.win.refresh()
+
+    def draw_overlay(self):
+        """ Draw the overlay lines, blanking their rows when it is hidden. The loading
+            indicator keeps the right end of the last row.
+        """
+        width = self.width - 22
+        lines = self.overlay or []
+        for (row, text) in enumerate((lines + ['', ''])[:2], 2):
+            self.win.addstr(row, 5, '{0:<{1}}'.format(text[:width], width))
+
+    def set_loading(self, loading):
+        """ Show or hide the loading indicator
+            Args:
+                loading (bool) = Whether requests are in flight
+        """
+        message = 'Loading...'
+        self.win.addstr(3, self.width - len(message) - 5, message if loading else ' ' * len(message))
         self.win.refresh()
 
     def format_now_playing(self, track):
@@ -315,6 +567,64 @@ class Input_Window(Window):
 
         return usrInput
 
+    def get_incremental_input(self, displayMsg, onChange, onIdle, debounce=0.15, pollInterval=0.05):
+        """ Draw screen with displayMsg and read keys one at a time. Once typing pauses for
+            debounce seconds onChange is called with the text, and onIdle is called between
+            keys. Return the text on enter key-press, or None on escape.
+            Args:
+                displayMsg (str) = The message to display
+                onChange (func) = Called with the text whenever it settles on a new value
+                onIdle (func) = Called while waiting for keys, to run other work on this thread
+                debounce (float) = The seconds without a key-press before the text is sent
+                pollInterval (float) = The max seconds to wait for a key-press
+        """
+        text = ''
+        sentText = ''
+        lastKeyTime = 0
+        curses.curs_set(1)
+        self.win.keypad(True)
+        self.win.timeout(int(pollInterval * 1000))
+        while True:
+            self.draw_input(displayMsg, text)
+            try:
+                key = self.win.get_wch()
+            except curses.error:
+                key = None
+
+            if key in ('\n', '\r', curses.KEY_ENTER):
+                break
+            elif key == '\x1b':
+                text = None
+                break
+            elif key in ('\x7f', '\b', curses.KEY_BACKSPACE):
+                text = text[:-1]
+                lastKeyTime = time.time()
+            elif isinstance(key, str) and key.isprintable():
+                text += key
+                lastKeyTime = time.time()
+            elif key is None:
+                if text != sentText and time.time() - lastKeyTime >= debounce:
+                    sentText = text
+                    onChange(text)
+                onIdle()
+
+        curses.curs_set(0)
+        del self.win
+
+        return text
+
+    def draw_input(self, displayMsg, text):
+        """ Redraw the input line, which other windows may have drawn over
+            Args:
+                displayMsg (str) = The message to display
+                text (str) = The text entered so far
+        """
+        self.win.border(1)
+        line = (displayMsg + text)[-(self.width - 10):]
+        self.win.addstr(1, 5, line + ' ' * (self.width - 10 - len(line)))
+        self.win.move(1, 5 + len(line))
+        self.win.refresh()
+
 class Message_Window(Window):
     
     def flash_message(self, displayMsg, dur):
@@ -365,7 +675,9 @@ j:      Move Down                SPACE:  Play/Pause Player          L:      Play
 k:      Move Up                  r:      Toggle Repeat One Track    H:      Play Previous Queued Song
 l:      Move Right               p:      Open My Playlists          C:      Clear Queue
 h:      Move Left                f:      Next in Search History     q:      Display Queue
-                                 p:      Open My Playlists
+/:      Search As You Type       b:      Back in Search History     n:      Queue Track To Play Next
+                                 m:      Toggle Metrics Overlay     x:      Remove Track From Queue
+                                 P:      Start/Stop Profiler        z:      Toggle Queue Shuffle
 '''
     def draw_screen(self):
         self.win.addstr(0, 0, self.help_text)
@@ -1,15 +1,30 @@
+import logging
 import sys
 import spotipy
 import spotipy.oauth2 as oauth2
 import threading
 import subprocess
+import time
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from metrics import METRICS
+from libraryIndex import DEFAULT_LIMITS, KEY_FIELDS, Library_Index, record_tokens, tokenize
+from records import Album, Artist, Playlist, Track, intern
+from responseCache import Response_Cache
+from tokenManager import Token_Manager
 from webserver import Web_Server
 from functools import reduce
+from httpTransport import Http_Transport
+from requestScheduler import BACKGROUND, INTERACTIVE, Request_Scheduler
+
+# spotipy logs every failed request, which would draw over the curses screen. Rate limited
+# requests are retried by the request scheduler and other failures are reported in the UI.
+logging.getLogger('spotipy').addHandler(logging.NullHandler())
 
 class Spotify_Model(object):
     
-    def __init__(self, auth, scope='playlist-read-private playlist-read-collaborative playlist-modify-public playlist-modify-private'):
+    def __init__(self, auth, scope='playlist-read-private playlist-read-collaborative playlist-modify-public playlist-modify-private', searchTimeout=10, cachePath=None, pageConcurrency=8, libraryPath=None, offline=False, maxPrefixResults=64, hydrateConcurrency=2, transport=None, scheduler=None):
         """ A controller to communicate with Spotipy
 
             Args:
@@ -18,6 +33,15 @@ class Spotify_Model(object):
                 clint_id (str) = Spotify client id
                 client_secret (str) = Spotify client secret
                 redirect_uri (str) = Spotify app redirect uri
+                searchTimeout (float) = Seconds to wait on each category of a full search
+                cachePath (str) = Optional file to persist API responses to between sessions
+                pageConcurrency (int) = The max number of pages of a paged result fetched at once
+                libraryPath (str) = Optional file to keep the local index of seen tracks, albums and artists in
+                offline (boolean) = Whether to answer only from the response cache and local index
+                maxPrefixResults (int) = The number of recent search-as-you-type results kept for reuse
+                hydrateConcurrency (int) = The max number of bulk album requests run at once in the background
+                transport (obj) = The Http_Transport to make requests with, shared with other users of the network
+                scheduler (obj) = The Request_Scheduler every Web API request passes through
         """
 
         self.username = auth['username']
@@ -26,31 +50,54 @@ class Spotify_Model(object):
         self.redirect_uri = auth['redirect_uri']
         self.scope = scope
         self.sp_oauth = None
+        self.tokenManager = None
         self.url = None
+        self.searchTimeout = searchTimeout
+        self.transport = transport or Http_Transport()
+        self.scheduler = scheduler or Request_Scheduler()
+        self.cache = Response_Cache(path=cachePath)
+        self.library = Library_Index(path=libraryPath)
+        self.offline = offline
+
+        # Normalized query -> category -> results of recent search-as-you-type queries
+        self.prefixResults = OrderedDict()
+        self.maxPrefixResults = maxPrefixResults
 
-        self.accessToken = self.get_access_token()
+        # One worker per full_search category
+        self.searchPool = ThreadPoolExecutor(max_workers=3)
+        self.pagePool = ThreadPoolExecutor(max_workers=pageConcurrency)
+        # Background album hydration has its own pool so it never waits on the pools of the calls that start it
+        self.hydratePool = ThreadPoolExecutor(max_workers=hydrateConcurrency)
+
+        self.accessToken = None if offline else self.get_access_token()
         if self.accessToken:
-            self.spotify = spotipy.Spotify(auth=self.accessToken)
+            self.spotify = spotipy.Spotify(auth=self.accessToken, requests_session=self.transport.session, requests_timeout=self.transport.timeout)
         else:
-            self.spotify = spotipy.Spotify()
+            self.spotify = spotipy.Spotify(requests_session=self.transport.session, requests_timeout=self.transport.timeout)
 
     def get_access_token(self):
         """ Return Spotify Web API authorization access token """
+        if not self.tokenManager:
+            tokenInfo = self.get_token_info()
+            if not tokenInfo:
+                return None
+            self.tokenManager = Token_Manager(self.sp_oauth, tokenInfo)
+        return self.tokenManager.get_access_token()
+
+    def get_token_info(self):
+        """ Return Spotify Web API token info from the cache file or browser authorization """
         if self.username and self.client_id and self.client_secret and self.redirect_uri:
             if not self.sp_oauth:
-                self.sp_oauth = oauth2.SpotifyOAuth(self.client_id, self.client_secret, self.redirect_uri, scope=self.scope, cache_path=".cache-"+self.username)
+                self.sp_oauth = oauth2.SpotifyOAuth(self.client_id, self.client_secret, self.redirect_uri, scope=self.scope, cache_path=".cache-"+self.username, requests_session=self.transport.session, requests_timeout=self.transport.timeout)
             token_info = self.sp_oauth.get_cached_token()
             if not token_info:
                 self.get_token_from_browser()
                 while not self.url:
-                    sleep(.5)
+                    time.sleep(.5)
                 code = self.url.split("?code=")[1].split("&")[0]
                 self.url = None
                 token_info = self.sp_oauth.get_access_token(code)
-            if token_info:
-                return token_info['access_token']
-            else:
-                return None
+            return token_info or None
         else:
             return None
 
@@ -67,14 +114,70 @@ class Spotify_Model(object):
         self.url = webserver.run()
 
     def search(self, method, *args, **kwargs):
-        """ Refresh expired access token if required and return results from spotipy method
+        """ Return cached results for spotipy method, or results from spotipy method
+            using the in-memory access token
+            Args:
+                method (func) = The spotipy method to execute
+        """
+        with METRICS.timer('model.search'):
+            results = self.cache.get(method.__name__, args, kwargs)
+            if results is not None:
+                return results
+            results = self.request(method, *args, **kwargs)
+            self.cache.put(method.__name__, args, kwargs, results)
+            return results
+
+    def request(self, method, *args, **kwargs):
+        """ Return results from spotipy method using the in-memory access token, bypassing the cache
+            Args:
+                method (func) = The spotipy method to execute
+        """
+        return self.scheduled_request(INTERACTIVE, method, *args, **kwargs)
+
+    def scheduled_request(self, priority, method, *args, **kwargs):
+        """ Return results from spotipy method once the request scheduler lets it run,
+            retrying it while Spotify rate limits
             Args:
+                priority (int) = INTERACTIVE, or BACKGROUND for prefetching
                 method (func) = The spotipy method to execute
         """
-        self.access_token = self.get_access_token()
-        if self.access_token:
-            self.spotify._auth = self.access_token
-        return method(*args, **kwargs)
+        if self.offline:
+            raise ConnectionError('Offline and {0} is not cached'.format(method.__name__))
+
+        def call():
+            if self.tokenManager:
+                self.spotify._auth = self.tokenManager.get_access_token()
+            with METRICS.timer('api.request'):
+                return method(*args, **kwargs)
+
+        return self.scheduler.call(priority, call)
+
+    def save_cache(self):
+        """ Persist cached API responses and the local index if on-disk caching is configured """
+        self.cache.save()
+        self.library.close()
+
+    def get_all_pages(self, method, parse, *args, limit=50, **kwargs):
+        """ Return parsed items from every page of a paged spotipy method. The first page
+            gives the total, then the remaining pages are fetched concurrently and parsed
+            as they arrive.
+            Args:
+                method (func) = The paged spotipy method to execute
+                parse (func) = Returns parsed items for one page of results
+                limit (int) = The number of items per page
+        """
+        first = self.search(method, *args, limit=limit, offset=0, **kwargs)
+        pages = [parse(first)]
+        offsets = range(limit, first['total'], limit)
+        pages += [None] * len(offsets)
+
+        futures = {}
+        for (pageNum, offset) in enumerate(offsets, 1):
+            futures[self.pagePool.submit(self.search, method, *args, limit=limit, offset=offset, **kwargs)] = pageNum
+        for future in as_completed(futures):
+            pages[futures[future]] = parse(future.result())
+
+        return [item for page in pages for item in page]
 
     def sort(self, results, sort_field, reverse=False):
         """ Return sorted results
@@ -120,34 +223,155 @@ class Spotify_Model(object):
 
     def get_my_playlists(self):
         """ Return user playlists """
-        playlists = self.search(self.spotify.user_playlists, self.username) if self.accessToken else None
+        playlists = self.get_all_pages(self.spotify.user_playlists, self.parse_playlists, self.username) if self.accessToken else []
         return {
-            'playlists': self.parse_playlists(playlists)
+            'playlists': playlists
         }
 
+    def local_search(self, query):
+        """ Return artists, albums, and tracks matching query from the local index
+            Args:
+                query (str) = The query string
+        """
+        return self.library.search(query)
+
+    def merge_results(self, remote, local):
+        """ Return remote results followed by the local results they do not already contain
+            Args:
+                remote (obj) = Result category name -> array of results from Spotify
+                local (obj) = Result category name -> array of results from the local index
+        """
+        results = {}
+        for category in set(remote) | set(local):
+            lines = list(remote.get(category, []))
+            seen = set(self.result_key(line) for line in lines)
+            lines += [line for line in local.get(category, []) if self.result_key(line) not in seen]
+            results[category] = lines
+        return results
+
+    def result_key(self, line):
+        """ Return the unique id of a result line
+            Args:
+                line (obj) = A track, album or artist record
+        """
+        return (line['category'], line.get(KEY_FIELDS.get(line['category'])))
+
+    def category_searches(self, query, categories):
+        """ Return results of the searches for each category, run concurrently. Categories
+            which fail or time out are left out.
+            Args:
+                query (str) = The query string
+                categories (array) = The result category names to search
+        """
+        searchMethods = {'artists': self.artist_search, 'albums': self.album_search, 'tracks': self.track_search}
+        searches = {category: self.searchPool.submit(searchMethods[category], query) for category in categories}
+        wait(searches.values(), timeout=self.searchTimeout)
+
+        results = {}
+        for (category, future) in searches.items():
+            if future.done():
+                try:
+                    results[category] = future.result()[category]
+                except Exception:
+                    pass
+            else:
+                future.cancel()
+        return results
+
     def full_search(self, query):
-        """ Return artists, albums, and tracks matching query
+        """ Return artists, albums, and tracks matching query, merged with matches from
+            the local index. The three category searches run concurrently and a category
+            which fails or times out only has its local matches rather than failing the
+            whole search.
             Args:
                 query (str) = The query string
         """
-        return {
-            'artists': self.artist_search(query)['artists'],
-            'albums': self.album_search(query)['albums'],
-            'tracks': self.track_search(query)['tracks'],
-        }
-    
+        if self.offline:
+            return self.local_search(query)
+        results = {'artists': [], 'albums': [], 'tracks': []}
+        results.update(self.category_searches(query, list(results)))
+        return self.merge_results(results, self.local_search(query))
+
+    def prefix_search(self, query):
+        """ Return artists, albums, and tracks matching a partly typed query. A category whose
+            results for an earlier prefix of query were complete is filtered from those
+            results instead of being searched again.
+            Args:
+                query (str) = The query string
+        """
+        if self.offline:
+            return self.local_search(query)
+        results = {}
+        for category in ('artists', 'albums', 'tracks'):
+            lines = self.prefix_results(query, category)
+            if lines is not None:
+                results[category] = lines
+        results.update(self.category_searches(query, [category for category in ('artists', 'albums', 'tracks') if category not in results]))
+
+        # Only categories which succeeded are remembered
+        key = ' '.join(tokenize(query))
+        self.prefixResults.pop(key, None)
+        self.prefixResults[key] = dict(results)
+        while len(self.prefixResults) > self.maxPrefixResults:
+            self.prefixResults.popitem(last=False)
+
+        for category in ('artists', 'albums', 'tracks'):
+            results.setdefault(category, [])
+        return self.merge_results(results, self.local_search(query))
+
+    def prefix_results(self, query, category):
+        """ Return results for query filtered from the complete results of an earlier
+            prefix of it, or None if there are none
+            Args:
+                query (str) = The query string
+                category (str) = The result category name
+        """
+        tokens = tokenize(query)
+        key = ' '.join(tokens)
+        for (prefix, results) in reversed(self.prefixResults.items()):
+            lines = results.get(category)
+            # A full page of results may have left out matches of the longer query
+            if lines is None or len(lines) >= DEFAULT_LIMITS[category] or not key.startswith(prefix):
+                continue
+            return [line for line in lines if all(any(word.startswith(token) for word in record_tokens(line)) for token in tokens)]
+        return None
+
     def get_artist(self, artist_id):
-        """ Return albums and tracks for artist
+        """ Return albums and tracks for artist. Every page of every album group is fetched,
+            then the albums' track lists are fetched in bulk in the background.
             Args:
                 artist_id (str) = The Spotify artist_id for the artist to get results for
         """
-        albums = self.search(self.spotify.artist_albums, artist_id)
+        albums = self.get_all_pages(self.spotify.artist_albums, lambda page: self.parse_albums(page['items']), artist_id, include_groups='album,single,compilation,appears_on')
         tracks = self.search(self.spotify.artist_top_tracks, artist_id)
+        if not self.offline:
+            self.hydrate_albums([album['album_id'] for album in albums])
         return {
-            'albums': self.parse_albums(albums['items']),
+            'albums': albums,
             'tracks': self.parse_tracks(tracks['tracks'])
         }
 
+    def hydrate_albums(self, album_ids, batchSize=20):
+        """ Fetch albums which are not cached through the multi-album endpoint in the background
+            and cache each one as its own album response, so opening it needs no request
+            Args:
+                album_ids (array) = The Spotify album_ids to fetch
+                batchSize (int) = The max number of albums per request, 20 for the Web API
+        """
+        album_ids = [album_id for album_id in album_ids if not self.cache.contains('album', (album_id,), {})]
+        for start in range(0, len(album_ids), batchSize):
+            self.hydratePool.submit(self.hydrate_album_batch, album_ids[start:start + batchSize])
+
+    def hydrate_album_batch(self, album_ids):
+        """ Fetch and cache one batch of albums
+            Args:
+                album_ids (array) = Up to 20 Spotify album_ids
+        """
+        results = self.scheduled_request(BACKGROUND, self.spotify.albums, album_ids)
+        for album in results['albums']:
+            if album:
+                self.cache.put('album', (album['id'],), {}, album)
+
     def get_album(self, album_id, album_name=''):
         """ Return tracks for album
             Args:
@@ -163,9 +387,9 @@ class Spotify_Model(object):
             Args:
                 playlist_id (str) = The Spotify playlist_id to get tracks for
         """
-        tracks = self.search(self.spotify.user_playlist, playlist['owner_id'], playlist['playlist_id'])
+        tracks = self.get_all_pages(self.spotify.user_playlist_tracks, lambda page: self.parse_playlist(page['items']), playlist['owner_id'], playlist['playlist_id'], limit=100)
         return {
-            'tracks': self.parse_playlist(tracks['tracks']['items'])
+            'tracks': tracks
         }
 
     def parse_tracks(self, results, artist=None, album=None, album_id=None, source=None):
@@ -180,19 +404,20 @@ class Spotify_Model(object):
         """
         res = []
         for track in results:
-            track_info = {
-                'track_name': track['name'],
-                'track_number': track['track_number'],
-                'album_name': album or track['album']['name'],
-                'album_id': album_id or track['album']['id'],
-                'artist_name': artist or track['artists'][0]['name'],
-                'artist_id': track['artists'][0]['id'],
-                'track_uri': track['uri'],
-                'category': 'track',
-            }
+            track_info = Track(
+                track_name=track['name'],
+                track_number=track['track_number'],
+                album_name=album or track['album']['name'],
+                album_id=album_id or track['album']['id'],
+                artist_name=artist or track['artists'][0]['name'],
+                artist_id=track['artists'][0]['id'],
+                track_uri=track['uri'],
+                duration_ms=track['duration_ms'],
+            )
             if source == 'search':
-                track_info['popularity'] = track['popularity']
+                track_info.popularity = track['popularity']
             res.append(track_info)
+        self.library.add(res)
         if source == 'search': return self.sort(res, 'popularity', reverse=True)
         elif source == 'album': return self.sort(res, 'track_number', reverse=False)
         else: return res
@@ -204,13 +429,13 @@ class Spotify_Model(object):
         """
         res = []
         for album in results:
-            res.append({
-                'album_id': album['id'],
-                'album_name': album['name'],
-                'album_uri': album['uri'],
-                'album_art_uri': reduce(lambda f,s: f if f['height']>s['height'] else s, album['images']) if album['images'] and len(album['images']) > 0 else None,
-                'category': 'album',
-            })
+            res.append(Album(
+                album_id=album['id'],
+                album_name=album['name'],
+                album_uri=album['uri'],
+                album_art_uri=reduce(lambda f,s: f if f['height']>s['height'] else s, album['images']) if album['images'] and len(album['images']) > 0 else None,
+            ))
+        self.library.add(res)
         return res
 
     def parse_artists(self, results):
@@ -220,13 +445,13 @@ class Spotify_Model(object):
         """
         res = []
         for artist in results:
-            res.append({
-                'artist_id': artist['id'],
-                'artist_name': artist['name'],
-                'artist_uri': artist['uri'],
-                'popularity': artist['popularity'],
-                'category': 'artist',
-            })
+            res.append(Artist(
+                artist_id=artist['id'],
+                artist_name=artist['name'],
+                artist_uri=artist['uri'],
+                popularity=artist['popularity'],
+            ))
+        self.library.add(res)
         return self.sort(res, 'popularity', reverse=True)
 
     def parse_playlists(self, results):
@@ -237,12 +462,11 @@ class Spotify_Model(object):
         res = []
         if results and 'items' in results:
             for playlist in results['items']:
-                res.append({
-                    'playlist_name': playlist['name'],
-                    'playlist_id': playlist['id'],
-                    'owner_id': playlist['owner']['id'],
-                    'category': 'playlist',
-                })
+                res.append(Playlist(
+                    playlist_name=playlist['name'],
+                    playlist_id=playlist['id'],
+                    owner_id=intern(playlist['owner']['id']),
+                ))
         return res
 
     def parse_playlist(self, result):
@@ -252,12 +476,19 @@ class Spotify_Model(object):
         """
         res = []
         for track in result:
-            res.append({
-                'track_name': track['track']['name'],
-                'track_number': track['track']['track_number'],
-                'album_name': track['track']['album']['name'],
-                'artist_name': track['track']['artists'][0]['name'],
-                'track_uri': track['track']['uri'],
-                'category': 'track',
-            })
+            track = track['track']
+            if not track:
+                # Tracks removed from Spotify have no track object
+                continue
+            res.append(Track(
+                track_name=track['name'],
+                track_number=track['track_number'],
+                album_name=track['album']['name'],
+                album_id=track['album']['id'],
+                artist_name=track['artists'][0]['name'],
+                artist_id=track['artists'][0]['id'],
+                track_uri=track['uri'],
+                duration_ms=track['duration_ms'],
+            ))
+        self.library.add(res)
         return res
@@ -1,33 +1,13 @@
-import subprocess
+from playerBackends import AppleScript_Backend
 
 class Spotify_Player(object):
 
-    def make_apple_script(self, cmd):
-        """ Format apple script
+    def __init__(self, backend=None):
+        """ Send commands to the music player
             Args:
-                cmd (str) = The applescript string
+                backend (obj) = The Player_Backend to control. Defaults to the Spotify desktop app.
         """
-        return ['osascript', '-e', cmd]
- 
-    def send_script(self, cmd, response=False):
-        """ Send apple script and return formatted response
-            Args:
-                cmd (str) = The applescript string
-                response (boolean) = Whether to expect and return a response from the applescript call
-        """
-        script = self.make_apple_script(cmd)
-        if response:
-            res = subprocess.check_output(script)
-            return self.bytes_to_string(res)
-        else:
-            subprocess.call(script)
-
-    def bytes_to_string(self, byts):
-        """ Convert bytes to UTF-8 endoded string
-            Args:
-                bytes (bytes) = The bytes to convert
-        """
-        return byts.decode('utf-8').rstrip()
+        self.backend = backend or AppleScript_Backend()
 
     def play_track(self, track_uri):
         """ Command Spotify player to play track
@@ -35,28 +15,34 @@ class Spotify_Player(object):
                 track_uri (str) = The Spotify API track uri for the track to be played
         """
         try:
-            self.send_script('tell application "Spotify" to play track "{0}"'.format(track_uri))
+            self.backend.play_track(track_uri)
         except:
             pass
 
     def play_pause(self):
-        """ Command Spotify to toggle play/pause """    
+        """ Command Spotify to toggle play/pause """
         try:
-            self.send_script('tell application "Spotify" to playpause')
+            self.backend.play_pause()
         except:
             pass
 
-    def get_player_state(self):
-        """ Get and return Spotify Player state """
+    def get_status(self):
+        """ Get and return Spotify Player state, position, track id and track duration in one call """
         try:
-            return self.send_script('tell application "Spotify" \n get player state \n end tell', True)
+            return self.backend.get_status()
         except:
             pass
 
+    def get_player_state(self):
+        """ Get and return Spotify Player state """
+        status = self.get_status()
+        return status['state'] if status else None
+
     def get_player_position(self):
         """ Get and return Spotify Player position """
-        try:
-            return self.send_script('tell application "Spotify" \n get player position \n end tell', True)
-        except:
-            pass
+        status = self.get_status()
+        return str(status['position']) if status else None
 
+    def close(self):
+        """ Shut down the player backend """
+        self.backend.close()
@@ -0,0 +1,61 @@
+import threading
+import time
+
+
+class Token_Manager(object):
+
+    def __init__(self, sp_oauth, tokenInfo, refreshMargin=120, retryInterval=5):
+        """ Hold the Spotify OAuth token in memory and renew it in the background
+            Args:
+                sp_oauth (obj) = The spotipy SpotifyOAuth object that owns the token cache file
+                tokenInfo (obj) = The current token info with access_token, refresh_token and expires_at
+                refreshMargin (int) = Seconds before expiry to renew the token
+                retryInterval (int) = Seconds to wait before retrying a failed renewal
+        """
+        self.sp_oauth = sp_oauth
+        self.tokenInfo = tokenInfo
+        self.refreshMargin = refreshMargin
+        self.retryInterval = retryInterval
+
+        # Held for the duration of a renewal so concurrent callers share one refresh
+        self.refreshLock = threading.Lock()
+        self.stopped = threading.Event()
+
+        self.refresherThread = threading.Thread(target=self.listen_for_expiry)
+        self.refresherThread.daemon = True
+        self.refresherThread.start()
+
+    def get_access_token(self):
+        """ Return the in-memory access token, renewing it only if it has already expired """
+        tokenInfo = self.tokenInfo
+        if tokenInfo['expires_at'] > time.time():
+            return tokenInfo['access_token']
+        return self.refresh(tokenInfo)['access_token']
+
+    def refresh(self, staleInfo):
+        """ Renew token unless another caller already replaced staleInfo and return current token info
+            Args:
+                staleInfo (obj) = The token info the caller found to be expiring
+        """
+        with self.refreshLock:
+            if self.tokenInfo is staleInfo:
+                # spotipy writes the token cache file only here, when the token changes
+                self.tokenInfo = self.sp_oauth.refresh_access_token(staleInfo['refresh_token'])
+            return self.tokenInfo
+
+    def listen_for_expiry(self):
+        """ Sleep until shortly before the token expires and renew it """
+        while not self.stopped.is_set():
+            tokenInfo = self.tokenInfo
+            delay = tokenInfo['expires_at'] - self.refreshMargin - time.time()
+            if delay > 0:
+                self.stopped.wait(delay)
+                continue
+            try:
+                self.refresh(tokenInfo)
+            except Exception:
+                self.stopped.wait(self.retryInterval)
+
+    def stop(self):
+        """ Stop background renewal """
+        self.stopped.set()
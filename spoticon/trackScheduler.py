@@ -0,0 +1,111 @@
+import threading
+import time
+
+
+class Track_Advance_Scheduler(object):
+
+    def __init__(self, endWindow=1.0, nearInterval=0.05, maxSleep=30.0, pausedInterval=0.5, maxPausedInterval=5.0, adoptAfter=2.0):
+        """ Decide when to query the player so the end of a track is seen promptly with few queries
+            Args:
+                endWindow (float) = Seconds before the expected end of a track to start polling closely
+                nearInterval (float) = Seconds between polls near the end of a track
+                maxSleep (float) = The longest sleep while a track plays, so seeks are noticed
+                pausedInterval (float) = The first poll interval while the player is paused
+                maxPausedInterval (float) = The longest poll interval while the player is paused
+                adoptAfter (float) = Seconds after which an unexpected playing track is followed instead
+        """
+        self.endWindow = endWindow
+        self.nearInterval = nearInterval
+        self.maxSleep = maxSleep
+        self.pausedInterval = pausedInterval
+        self.maxPausedInterval = maxPausedInterval
+        self.adoptAfter = adoptAfter
+
+        self.durations = {}
+        self.expectedTrack = None
+        self.expectedSince = 0
+        self.nearEnd = False
+        self.delay = pausedInterval
+        self.lock = threading.Lock()
+        self.wakeEvent = threading.Event()
+
+    def expect(self, track):
+        """ Follow a track that was just started
+            Args:
+                track (obj) = The track being played
+        """
+        with self.lock:
+            if track.get('duration_ms'):
+                self.durations[track['track_uri']] = track['duration_ms']
+            self.expectedTrack = track['track_uri']
+            self.expectedSince = time.monotonic()
+            self.nearEnd = False
+            self.delay = self.nearInterval
+        self.wake()
+
+    def wake(self):
+        """ Query the player now, e.g. after play/pause """
+        with self.lock:
+            self.delay = min(self.delay, self.nearInterval)
+        self.wakeEvent.set()
+
+    def back_off(self):
+        """ Double the poll interval up to maxPausedInterval. Caller must hold lock """
+        self.delay = self.pausedInterval if self.delay < self.pausedInterval else min(self.delay * 2, self.maxPausedInterval)
+
+    def observe(self, status):
+        """ Return whether the followed track has ended and set the delay until the next query
+            Args:
+                status (obj) = The player status with state, position, track_id and duration_ms
+        """
+        with self.lock:
+            if not status or not self.expectedTrack:
+                self.back_off()
+                return False
+
+            if status['track_id'] != self.expectedTrack:
+                if self.nearEnd:
+                    # The player moved on to a track of its own
+                    self.nearEnd = False
+                    self.expectedTrack = None
+                    self.back_off()
+                    return True
+                if time.monotonic() - self.expectedSince <= self.adoptAfter:
+                    # The player may not have started the track yet
+                    self.delay = self.nearInterval
+                    return False
+                if status['state'] != 'playing':
+                    self.back_off()
+                    return False
+                # Relinked or changed in the player itself
+                self.expectedTrack = status['track_id']
+
+            position = float(status['position'] or 0)
+            if status['state'] != 'playing':
+                if self.nearEnd and position == 0:
+                    self.nearEnd = False
+                    self.expectedTrack = None
+                    self.back_off()
+                    return True
+                self.back_off()
+                return False
+
+            duration = status.get('duration_ms') or self.durations.get(self.expectedTrack)
+            if not duration:
+                self.delay = self.maxSleep
+                return False
+
+            remaining = duration / 1000.0 - position
+            if remaining > self.endWindow:
+                self.nearEnd = False
+                self.delay = min(remaining - self.endWindow, self.maxSleep)
+            else:
+                # Sleep to just before the end, then poll every nearInterval
+                self.nearEnd = True
+                self.delay = max(remaining - self.nearInterval, self.nearInterval)
+            return False
+
+    def wait(self):
+        """ Sleep until the next player query is due or until woken """
+        self.wakeEvent.wait(self.delay)
+        self.wakeEvent.clear()